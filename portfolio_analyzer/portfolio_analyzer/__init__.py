@@ -7,11 +7,9 @@ This package provides:
 - Symbol-level aggregation
 """
 
+import importlib
+
 from .loaders import load_trades_from_csv
-from .analyzer import PortfolioAnalyzer
-from .metrics import calculate_cagr, calculate_xirr
-from .reports import TextReportGenerator, PDFReportGenerator, HTMLReportGenerator
-from .cli import main
 
 __version__ = "1.3.6"
 __author__ = "Zhuo Robert Li"
@@ -22,8 +20,34 @@ __all__ = [
     'load_trades_from_csv',
     'calculate_cagr',
     'calculate_xirr',
+    'calculate_xirr_batch',
     'TextReportGenerator',
     'PDFReportGenerator',
     'HTMLReportGenerator',
     'main',
 ]
+
+# Heavier submodules (yfinance, scipy, plotting) are imported on first attribute access (PEP 562)
+_LAZY_ATTRS = {
+    'PortfolioAnalyzer': '.analyzer',
+    'calculate_cagr': '.metrics',
+    'calculate_xirr': '.metrics',
+    'calculate_xirr_batch': '.metrics',
+    'TextReportGenerator': '.reports',
+    'PDFReportGenerator': '.reports',
+    'HTMLReportGenerator': '.reports',
+    'main': '.cli',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
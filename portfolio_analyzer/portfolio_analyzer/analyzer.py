@@ -5,12 +5,14 @@ Version: 1.3.4
 """
 
 import yfinance as yf
+import functools
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import IO, List, Dict, Optional, Union
+import numpy as np
 import pandas as pd
 import logging
 
-from .metrics import calculate_cagr, calculate_xirr, DAYS_PER_YEAR
+from .metrics import calculate_cagr, calculate_cagr_array, calculate_xirr, DAYS_PER_YEAR
 from .utils import (
     safe_divide, normalize_history_index, normalize_datetime,
     extract_history, download_history, SP500_SYMBOL, normalize_ticker
@@ -25,6 +27,45 @@ try:
 except ImportError:
     XIRR_AVAILABLE = False
 
+# S&P 500 history shared by every analyzer in the process (start, fetch day, history)
+_sp500_history_cache: Dict[str, object] = {}
+
+
+def _get_sp500_history(start_date: str) -> pd.DataFrame:
+    """Return S&P 500 history from start_date, downloading at most once per day.
+    
+    A history cached earlier today is reused whenever it starts on or before
+    start_date, so analyzers created in the same process share one download.
+    """
+    start = pd.Timestamp(start_date)
+    today = pd.Timestamp.now().normalize()
+    cached = _sp500_history_cache.get('history')
+    if (cached is not None and _sp500_history_cache['fetched'] == today
+            and _sp500_history_cache['start'] <= start):
+        return cached.loc[cached.index >= start]
+
+    sp500_data = download_history([SP500_SYMBOL], start_date)
+    history = normalize_history_index(extract_history(sp500_data, SP500_SYMBOL))
+    if not history.empty:
+        _sp500_history_cache.update(start=start, fetched=today, history=history)
+    return history
+
+
+def clear_sp500_history_cache() -> None:
+    """Forget the shared S&P 500 history so the next analysis downloads it again."""
+    _sp500_history_cache.clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def _holding_xirr(purchase_date: str, current_date: str,
+                  initial_value: float, current_value: float) -> float:
+    """XIRR of a single buy-and-hold position.
+
+    Memoized on its scalar inputs, so repeated lots and analyzers built over
+    the same trades and prices reuse one solve.
+    """
+    return calculate_xirr([purchase_date, current_date], [-initial_value, current_value])
+
 
 class PortfolioAnalyzer:
     """
@@ -89,9 +130,7 @@ class PortfolioAnalyzer:
                 self._stock_history_cache[symbol] = normalize_history_index(data)
 
         if self._sp500_full_history is None:
-            sp500_data = download_history([SP500_SYMBOL], earliest_date)
-            sp500_hist = extract_history(sp500_data, SP500_SYMBOL)
-            self._sp500_full_history = normalize_history_index(sp500_hist)
+            self._sp500_full_history = _get_sp500_history(earliest_date)
 
     def _validate_trade(self, trade: Dict) -> bool:
         """Validate that a trade has all required fields and valid values.
@@ -166,12 +205,13 @@ class PortfolioAnalyzer:
             if hist.empty:
                 return None
 
-            current_price = hist['Close'].iloc[-1]
+            # Prices may be stored as float32 (download dtype); values are computed in float64
+            current_price = float(hist['Close'].iloc[-1])
             current_date = normalize_datetime(hist.index[-1])
             
             # For S&P 500 trades, use REAL market prices (not provided estimates)
             if symbol == SP500_SYMBOL:
-                actual_purchase_price = hist['Close'].iloc[0]
+                actual_purchase_price = float(hist['Close'].iloc[0])
             else:
                 actual_purchase_price = purchase_price
 
@@ -184,12 +224,10 @@ class PortfolioAnalyzer:
             current_value = current_price * shares
             stock_cagr = calculate_cagr(initial_value, current_value, years_held)
 
+            current_date_str = current_date.strftime('%Y-%m-%d')
             stock_xirr = 0.0
             if XIRR_AVAILABLE:
-                stock_xirr = calculate_xirr(
-                    [purchase_date, current_date.strftime('%Y-%m-%d')],
-                    [-initial_value, current_value]
-                )
+                stock_xirr = _holding_xirr(purchase_date, current_date_str, initial_value, current_value)
 
             # Always download S&P 500 benchmark data separately to ensure consistency
             # UNLESS we're trading S&P 500 directly, in which case reuse same hist
@@ -206,17 +244,14 @@ class PortfolioAnalyzer:
             if sp500_hist.empty:
                 return None
             
-            sp500_purchase_price = sp500_hist['Close'].iloc[0]
-            sp500_current_price = sp500_hist['Close'].iloc[-1]
+            sp500_purchase_price = float(sp500_hist['Close'].iloc[0])
+            sp500_current_price = float(sp500_hist['Close'].iloc[-1])
             sp500_current_value = (sp500_current_price / sp500_purchase_price) * initial_value
             sp500_cagr = calculate_cagr(initial_value, sp500_current_value, years_held)
 
             sp500_xirr = 0.0
             if XIRR_AVAILABLE:
-                sp500_xirr = calculate_xirr(
-                    [purchase_date, current_date.strftime('%Y-%m-%d')],
-                    [-initial_value, sp500_current_value]
-                )
+                sp500_xirr = _holding_xirr(purchase_date, current_date_str, initial_value, sp500_current_value)
 
             return {
                 'symbol': symbol,
@@ -250,14 +285,6 @@ class PortfolioAnalyzer:
             return self._analysis_cache
             
         results = []
-        total_initial_value = 0
-        total_current_value = 0
-        total_sp500_current_value = 0
-        weighted_years_sum = 0
-        
-        cash_flow_dates = []
-        cash_flows_stocks = []
-        cash_flows_sp500 = []
 
         valid_trades = [trade for trade in self.trades if self._validate_trade(trade)]
         self._prepare_histories(valid_trades)
@@ -271,23 +298,18 @@ class PortfolioAnalyzer:
             )
             if perf:
                 results.append(perf)
-                total_initial_value += perf['initial_value']
-                total_current_value += perf['current_value']
-                total_sp500_current_value += perf['sp500_current_value']
-                weighted_years_sum += perf['initial_value'] * perf['years_held']
-                
-                cash_flow_dates.append(perf['purchase_date'])
-                cash_flows_stocks.append(-perf['initial_value'])
-                cash_flows_sp500.append(-perf['initial_value'])
-
-        if results:
-            today = self._analysis_timestamp.strftime('%Y-%m-%d')
-            
-            if cash_flows_stocks:
-                cash_flow_dates.append(today)
-                cash_flows_stocks.append(total_current_value)
-                cash_flows_sp500.append(total_sp500_current_value)
 
+        # Portfolio totals as single reductions over the per-trade columns
+        initial_values = np.array([perf['initial_value'] for perf in results], dtype=float)
+        current_values = np.array([perf['current_value'] for perf in results], dtype=float)
+        sp500_values = np.array([perf['sp500_current_value'] for perf in results], dtype=float)
+        years_held = np.array([perf['years_held'] for perf in results], dtype=float)
+        
+        total_initial_value = float(initial_values.sum())
+        total_current_value = float(current_values.sum())
+        total_sp500_current_value = float(sp500_values.sum())
+        weighted_years_sum = float(initial_values @ years_held)
+        
         portfolio_xirr = 0.0
         sp500_xirr = 0.0
         
@@ -296,17 +318,14 @@ class PortfolioAnalyzer:
             portfolio_cagr = calculate_cagr(total_initial_value, total_current_value, weighted_years)
             sp500_cagr = calculate_cagr(total_initial_value, total_sp500_current_value, weighted_years)
             
-            if cash_flow_dates:
-                # Sort cash flows by date (optimization: sort once, use for both stock and sp500)
-                sorted_pairs = sorted(zip(cash_flow_dates, cash_flows_stocks, cash_flows_sp500), 
-                                     key=lambda x: x[0])
-                cash_flow_dates_sorted = [d for d, _, _ in sorted_pairs]
-                cash_flows_stocks_sorted = [stock_cf for _, stock_cf, _ in sorted_pairs]
-                cash_flows_sp500_sorted = [sp500_cf for _, _, sp500_cf in sorted_pairs]
-            else:
-                cash_flow_dates_sorted = cash_flow_dates
-                cash_flows_stocks_sorted = cash_flows_stocks
-                cash_flows_sp500_sorted = cash_flows_sp500
+            # Purchases plus today's valuation, ordered by date with one stable argsort
+            # (ISO date strings sort chronologically); the order is shared by both series
+            today = self._analysis_timestamp.strftime('%Y-%m-%d')
+            cash_flow_dates = np.array([perf['purchase_date'] for perf in results] + [today])
+            order = np.argsort(cash_flow_dates, kind='stable')
+            cash_flow_dates_sorted = cash_flow_dates[order].tolist()
+            cash_flows_stocks_sorted = np.append(-initial_values, total_current_value)[order].tolist()
+            cash_flows_sp500_sorted = np.append(-initial_values, total_sp500_current_value)[order].tolist()
             
             portfolio_xirr = calculate_xirr(cash_flow_dates_sorted, cash_flows_stocks_sorted)
             sp500_xirr = calculate_xirr(cash_flow_dates_sorted, cash_flows_sp500_sorted)
@@ -366,6 +385,7 @@ class PortfolioAnalyzer:
         # Use cached timestamp from analyzer initialization for consistency
         today = self._analysis_timestamp
         today_str = str(today.date())
+        weighted_cagrs = self._weighted_cagr_by_symbol(trades, today)
         
         for symbol, stats in symbol_stats.items():
             initial_val = stats['total_initial_value']
@@ -380,28 +400,8 @@ class PortfolioAnalyzer:
             stats['avg_years_held'] = safe_divide(stats['total_years_weighted'], initial_val, 0.0)
             
             if stats['trades_count'] > 0:
-                trades_for_symbol = symbol_trades[symbol]
-                trades_with_dates = [t for t in trades_for_symbol if 'purchase_date' in t]
-                
-                if trades_with_dates:
-                    total_weighted_cagr = 0.0
-                    total_weight = 0.0
-                    
-                    for trade in trades_with_dates:
-                        purchase_date = pd.to_datetime(trade['purchase_date'])
-                        years_held = (today - purchase_date).days / 365.25
-                        
-                        individual_cagr = calculate_cagr(
-                            trade['initial_value'],
-                            trade['current_value'],
-                            years_held if years_held > 0 else 0.1
-                        )
-                        
-                        weight = trade['initial_value'] * years_held
-                        total_weighted_cagr += individual_cagr * weight
-                        total_weight += weight
-                    
-                    stats['avg_cagr'] = safe_divide(total_weighted_cagr, total_weight, 0.0)
+                if symbol in weighted_cagrs:
+                    stats['avg_cagr'] = weighted_cagrs[symbol]
                 else:
                     stats['avg_cagr'] = calculate_cagr(initial_val, current_val, stats['avg_years_held'])
             else:
@@ -450,7 +450,35 @@ class PortfolioAnalyzer:
         
         return symbol_stats
     
-    def print_report(self, output_file: Optional[str] = None) -> None:
+    @staticmethod
+    def _weighted_cagr_by_symbol(trades: List[Dict], today: pd.Timestamp) -> Dict[str, float]:
+        """Weighted CAGR per symbol over trades with a purchase_date.
+        
+        Each trade's CAGR is weighted by initial_value * years_held, i.e.
+        Σ(r_i * w_i) / Σ(w_i), computed for all symbols in one vectorized pass.
+        """
+        dated = [t for t in trades if 'purchase_date' in t]
+        if not dated:
+            return {}
+        
+        symbols, codes = np.unique([t['symbol'] for t in dated], return_inverse=True)
+        initial = np.array([t['initial_value'] for t in dated], dtype=float)
+        current = np.array([t['current_value'] for t in dated], dtype=float)
+        purchase_dates = pd.to_datetime([t['purchase_date'] for t in dated])
+        years_held = np.asarray((today - purchase_dates).days, dtype=float) / DAYS_PER_YEAR
+        
+        # 0.1 year floor for same-day purchases
+        cagrs = calculate_cagr_array(initial, current, np.where(years_held > 0, years_held, 0.1))
+        
+        weights = initial * years_held
+        weighted_sums = np.bincount(codes, weights=cagrs * weights, minlength=len(symbols))
+        weight_sums = np.bincount(codes, weights=weights, minlength=len(symbols))
+        return {
+            symbol: float(safe_divide(weighted_sum, weight_sum, 0.0))
+            for symbol, weighted_sum, weight_sum in zip(symbols.tolist(), weighted_sums, weight_sums)
+        }
+    
+    def print_report(self, output_file: Optional[Union[str, IO[str]]] = None) -> None:
         """Generate and print text report."""
         from .reports import TextReportGenerator
         TextReportGenerator.generate(self, output_file=output_file)
@@ -460,10 +488,10 @@ class PortfolioAnalyzer:
         from .reports import PDFReportGenerator
         PDFReportGenerator.generate(self, pdf_path)
     
-    def generate_html_report(self, html_path: str) -> None:
+    def generate_html_report(self, html_path: Union[str, IO[str]], minify: bool = False) -> None:
         """Generate interactive HTML dashboard report."""
         from .reports import HTMLReportGenerator
-        HTMLReportGenerator.generate(self, html_path)
+        HTMLReportGenerator.generate(self, html_path, minify=minify)
     
     # Backward compatibility methods
     def calculate_cagr(self, start_value: float, end_value: float, years: float) -> float:
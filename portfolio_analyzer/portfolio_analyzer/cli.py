@@ -17,6 +17,7 @@ def main():
     parser.add_argument("--output", "-o", help="Path to save report to text file")
     parser.add_argument("--pdf", help="Path to save report as PDF file with visualizations")
     parser.add_argument("--html", help="Path to save interactive HTML dashboard report")
+    parser.add_argument("--minify-html", action="store_true", help="Strip whitespace from the HTML dashboard")
     args = parser.parse_args()
 
     if args.csv:
@@ -42,7 +43,7 @@ def main():
     
     # Generate HTML if requested
     if args.html:
-        HTMLReportGenerator.generate(analyzer, args.html)
+        HTMLReportGenerator.generate(analyzer, args.html, minify=args.minify_html)
 
 
 if __name__ == "__main__":
@@ -3,66 +3,192 @@
 Author: Zhuo Robert Li
 """
 
+import csv
+import functools
+import os
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, IO, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Optional multi-threaded CSV parser
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
-def load_trades_from_csv(path: str) -> List[Dict]:
+TRADE_COLUMNS = ["symbol", "shares", "purchase_date", "price"]
+
+
+def _scan_csv(f: IO) -> Tuple[Union[str, bytes], bool]:
+    """Return the first line of f and whether any non-blank line follows it."""
+    first_line = f.readline()
+    # Iterate the file itself: it ends at EOF for text ('') and binary (b'') streams alike
+    has_rows = any(line.strip() for line in f)
+    return first_line, has_rows
+
+
+def _sniff_csv(source: Union[str, IO]) -> Tuple[Optional[List[str]], bool]:
+    """
+    Read the header row of a CSV and check for data rows without consuming the input.
+    
+    File-like objects are rewound to where they started; binary streams have
+    their header decoded as UTF-8, as read_csv does. Streams that cannot
+    seek back return (None, True) so the caller falls through to a full parse.
+    """
+    if hasattr(source, 'read'):
+        if not (hasattr(source, 'seekable') and source.seekable()):
+            return None, True
+        start = source.tell()
+        first_line, has_rows = _scan_csv(source)
+        source.seek(start)
+    else:
+        # Decode as read_csv does (UTF-8) rather than with the locale's encoding
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            first_line, has_rows = _scan_csv(f)
+    if isinstance(first_line, bytes):
+        first_line = first_line.decode('utf-8')
+    # pandas drops a UTF-8 byte order mark from the first column name; match it
+    # on the decoded text, whatever kind of stream the line came from
+    first_line = first_line.lstrip('\ufeff')
+    return next(csv.reader([first_line]), None), has_rows
+
+
+def _check_required_columns(columns) -> None:
+    """Raise ValueError if any of TRADE_COLUMNS is absent from columns."""
+    required = set(TRADE_COLUMNS)
+    missing = required - set(columns)
+    if missing:
+        raise ValueError(f"CSV missing required columns: {missing}. Expected: {required}")
+
+
+def _valid_numeric_mask(shares: np.ndarray, price: np.ndarray) -> np.ndarray:
+    """
+    Return a boolean mask of rows whose shares and price are both finite numbers.
+    
+    NaN (unparseable) and infinite values such as "inf" are both rejected.
+    """
+    return np.isfinite(shares) & np.isfinite(price)
+
+
+def _parse_trades(source: Union[str, IO], use_arrow: bool) -> List[Dict]:
+    """Parse, normalize and validate trades from a CSV path or file-like object."""
+    engine = "pyarrow" if use_arrow and PYARROW_AVAILABLE else None
+    read_kwargs = {}
+    header, has_rows = _sniff_csv(source)
+    if header:
+        # Reject malformed headers and header-only files before parsing any rows
+        _check_required_columns(header)
+        if not has_rows:
+            raise ValueError("CSV file is empty")
+        # Skip unused columns at the parser and keep text columns as strings;
+        # shares/price stay inferred so malformed values can be coerced below
+        read_kwargs["usecols"] = TRADE_COLUMNS
+        read_kwargs["dtype"] = {"symbol": str, "purchase_date": str}
+    start = source.tell() if hasattr(source, 'seekable') and source.seekable() else None
+    try:
+        df = pd.read_csv(source, engine=engine, **read_kwargs)
+    except pd.errors.ParserError:
+        # PyArrow rejects the whole file over one ragged row; the default engine
+        # pads short rows with NaN so the validity mask below drops just that row
+        if engine is None or (hasattr(source, 'read') and start is None):
+            raise
+        logger.debug(f"PyArrow could not parse {source}; retrying with the default engine")
+        if start is not None:
+            source.seek(start)
+        df = pd.read_csv(source, **read_kwargs)
+    # Headers that couldn't be sniffed (blank first line, non-seekable stream)
+    _check_required_columns(df.columns)
+    
+    if len(df) == 0:
+        raise ValueError("CSV file is empty")
+    
+    # Normalize types; each distinct symbol is stripped/upper-cased once, then
+    # broadcast back through the categorical codes
+    symbols = pd.Categorical(df["symbol"])
+    normalized = symbols.categories.astype(str).str.strip().str.upper()
+    symbol = normalized.take(symbols.codes, allow_fill=True, fill_value=np.nan)
+    shares = pd.to_numeric(df["shares"], errors="coerce")
+    price = pd.to_numeric(df["price"], errors="coerce")
+    # Fixed-format parse with a per-string cache; repeated dates are parsed once.
+    # Dates not in YYYY-MM-DD form become NaT and their rows are dropped below.
+    dates = pd.to_datetime(df["purchase_date"], format="%Y-%m-%d", cache=True, errors="coerce")
+    
+    # One validity mask (finite numbers, known symbol, parseable date), applied once
+    ok = (
+        _valid_numeric_mask(shares.to_numpy(dtype=np.float64), price.to_numpy(dtype=np.float64))
+        & symbol.notna()
+        & dates.notna().to_numpy()
+    )
+    if not ok.any():
+        raise ValueError("No valid trades found in CSV after validation")
+    
+    # Build the row dicts from whole-column lists; avoids to_dict's per-cell boxing
+    columns = [
+        symbol[ok].tolist(),
+        shares[ok].tolist(),
+        dates[ok].dt.strftime("%Y-%m-%d").tolist(),
+        price[ok].tolist(),
+    ]
+    trades = [dict(zip(TRADE_COLUMNS, row)) for row in zip(*columns)]
+    logger.info(f"Loaded {len(trades)} trades from {source}")
+    return trades
+
+
+@functools.lru_cache(maxsize=32)
+def _load_trades_cached(path: str, mtime_ns: int, size: int, use_arrow: bool) -> Tuple[Dict, ...]:
+    """Parse a CSV file once per (path, mtime, size); a rewritten file gets a new key."""
+    return tuple(_parse_trades(path, use_arrow))
+
+
+def load_trades_from_csv(path: Union[str, IO], use_arrow: bool = True) -> List[Dict]:
     """
     Load and validate trades from a CSV file.
     
     CSV Format:
         Symbol must be valid stock tickers, shares must be positive, 
         purchase_date in YYYY-MM-DD format, price must be positive.
+        Rows with a blank or missing symbol, an unparseable date, or a
+        missing, non-numeric or infinite shares/price value are dropped.
     
     Args:
-        path: Path to CSV file with columns: symbol, shares, purchase_date, price
+        path: Path to CSV file, or an open text or binary file-like object,
+              with columns: symbol, shares, purchase_date, price
+        use_arrow: Parse with the PyArrow engine when pyarrow is installed;
+                   falls back to the default pandas engine otherwise, or
+                   when PyArrow rejects the file (e.g. a row with missing fields)
     
     Returns:
-        List of trade dictionaries with validated and normalized data
+        List of trade dictionaries with validated and normalized data.
+        Results for file paths are cached until the file's mtime or size
+        changes; call load_trades_from_csv.cache_clear() to drop them.
     
     Raises:
         FileNotFoundError: If CSV file doesn't exist
         ValueError: If CSV is missing required columns or has invalid structure
     """
     try:
+        if hasattr(path, 'read'):
+            return _parse_trades(path, use_arrow)
+        
         if not path or not path.endswith('.csv'):
             raise ValueError(f"Expected CSV file, got: {path}")
         
-        df = pd.read_csv(path)
-        required = {"symbol", "shares", "purchase_date", "price"}
-        missing = required - set(df.columns)
-        if missing:
-            raise ValueError(f"CSV missing required columns: {missing}. Expected: {required}")
-        
-        if len(df) == 0:
-            raise ValueError("CSV file is empty")
-        
-        # Normalize types
-        df = df.copy()
-        df["symbol"] = df["symbol"].astype(str).str.strip().str.upper()
-        df["shares"] = pd.to_numeric(df["shares"], errors="coerce")
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        parsed_dates = pd.to_datetime(df["purchase_date"], errors="coerce")
-        df["purchase_date"] = parsed_dates.dt.strftime("%Y-%m-%d")
-        
-        # Drop rows with invalid types
-        df = df.dropna(subset=["symbol", "shares", "price", "purchase_date"])
-        
-        if len(df) == 0:
-            raise ValueError("No valid trades found in CSV after validation")
-        
-        ordered_cols = ["symbol", "shares", "purchase_date", "price"]
-        trades = df[ordered_cols].to_dict(orient="records")
-        logger.info(f"Loaded {len(trades)} trades from {path}")
-        return trades
+        stat = os.stat(path)
+        cached = _load_trades_cached(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, use_arrow)
+        # Hand out copies so callers can't mutate the cached trades
+        return [dict(trade) for trade in cached]
     except FileNotFoundError:
         logger.error(f"CSV file not found: {path}")
         raise
     except Exception as e:
         logger.error(f"Failed to load CSV: {e}")
         raise
+
+
+load_trades_from_csv.cache_clear = _load_trades_cached.cache_clear
+load_trades_from_csv.cache_info = _load_trades_cached.cache_info
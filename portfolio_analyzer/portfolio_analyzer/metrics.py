@@ -7,18 +7,28 @@ Author: Zhuo Robert Li
 Version: 1.3.4
 """
 
+from datetime import date
 import numpy as np
 import pandas as pd
-from scipy.optimize import newton
+from scipy.optimize import brentq
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Optional Rust XIRR solver; falls back to scipy's Brent method when missing
+# or too old to take the ACT/365.25 day count (DayCount, pyxirr 0.10)
+try:
+    import pyxirr
+    PYXIRR_AVAILABLE = hasattr(pyxirr, 'DayCount')
+except ImportError:
+    PYXIRR_AVAILABLE = False
+
 # Constants
 DAYS_PER_YEAR = 365.25
-NPV_CONVERGENCE_TOLERANCE = 1e-6  # Tolerance for NPV convergence check
-XIRR_MAX_ITERATIONS = 100  # Maximum iterations for Newton-Raphson method
-XIRR_INITIAL_GUESSES = [0.1, 0.01, -0.1, 0.5, -0.5]  # Initial rate guesses for XIRR
+XIRR_RATE_TOLERANCE = 1e-10  # Absolute tolerance on the solved rate (decimal)
+XIRR_MAX_ITERATIONS = 100  # Maximum iterations for Brent's method
+# Rates scanned (in order) for an NPV sign change; the large ones cover very short holdings
+XIRR_RATE_BRACKETS = [-0.999, -0.5, -0.1, 0.0, 0.1, 1.0, 10.0, 100.0, 1e4, 1e8, 1e16]
 
 
 def calculate_cagr(start_value: float, end_value: float, years: float) -> float:
@@ -40,13 +50,63 @@ def calculate_cagr(start_value: float, end_value: float, years: float) -> float:
     return (pow(end_value / start_value, 1 / years) - 1) * 100
 
 
+def calculate_cagr_array(start_values, end_values, years) -> np.ndarray:
+    """
+    Vectorized calculate_cagr over array-likes, broadcast element-wise.
+    
+    Args:
+        start_values: Initial investment values
+        end_values: Final investment values
+        years: Time periods in years
+        
+    Returns:
+        Array of CAGR percentages; elements with a non-positive start value
+        or period are 0.0, as in calculate_cagr
+    """
+    start = np.asarray(start_values, dtype=float)
+    end = np.asarray(end_values, dtype=float)
+    years = np.asarray(years, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (np.power(end / start, 1 / years) - 1) * 100
+    return np.where((start > 0) & (years > 0), cagr, 0.0)
+
+
+def _parse_dates(dates: list[str]) -> list[date]:
+    """Parse cash-flow dates, using date.fromisoformat for plain YYYY-MM-DD strings."""
+    try:
+        return [date.fromisoformat(d) for d in dates]
+    except (TypeError, ValueError):
+        return [pd.to_datetime(d).date() for d in dates]
+
+
+def _days_from_start(dates: list[str]) -> np.ndarray:
+    """Whole days from the first date, as an int64 array."""
+    ordinals = np.array([d.toordinal() for d in _parse_dates(dates)], dtype=np.int64)
+    return ordinals - ordinals[0]
+
+
+def _xirr_pyxirr(dates: list[str], cash_flows: list[float]) -> float:
+    """Solve XIRR with pyxirr using the same ACT/365.25 year as the scipy path."""
+    try:
+        parsed_dates = _parse_dates(dates)
+        rate = pyxirr.xirr(parsed_dates, cash_flows, silent=True,
+                           day_count=pyxirr.DayCount.ACT_365_25)
+        if rate is None or not np.isfinite(rate):
+            logger.debug(f"XIRR convergence failed for {len(dates)} cash flows")
+            return 0.0
+        return rate * 100
+    except Exception as e:
+        logger.warning(f"XIRR calculation error: {e}")
+        return 0.0
+
+
 def calculate_xirr(dates: list[str], cash_flows: list[float]) -> float:
     """
     Calculate Extended Internal Rate of Return (XIRR).
     
     XIRR accounts for the precise timing of cash flows, providing more accurate returns
-    when investments are made at different times. Uses Newton-Raphson root finding to
-    solve: NPV = Σ(CF / (1+r)^(Years)) = 0
+    when investments are made at different times. Uses pyxirr when installed, otherwise
+    Brent's bracketed root finding to solve: NPV = Σ(CF / (1+r)^(Years)) = 0
     
     Args:
         dates: List of dates in YYYY-MM-DD format for each cash flow
@@ -65,42 +125,110 @@ def calculate_xirr(dates: list[str], cash_flows: list[float]) -> float:
         logger.debug("XIRR requires both positive and negative cash flows")
         return 0.0
     
+    if PYXIRR_AVAILABLE:
+        return _xirr_pyxirr(dates, cash_flows)
+    
     try:
-        # Convert date strings to datetime objects
-        date_objects = [pd.to_datetime(d) for d in dates]
-        
-        # Calculate days from first date
-        start_date = date_objects[0]
-        days_from_start = [(d - start_date).days for d in date_objects]
+        # Year fractions from the first date, computed once for every NPV evaluation
+        years = _days_from_start(dates) / DAYS_PER_YEAR
+        flows = np.asarray(cash_flows, dtype=float)
         
         def npv_func(rate):
             """Calculate NPV for given rate (as decimal)"""
-            npv = 0
-            for i, cf in enumerate(cash_flows):
-                days = days_from_start[i]
-                years = days / DAYS_PER_YEAR
-                if rate <= -1:
-                    return float('inf')
-                npv += cf / ((1 + rate) ** years)
-            return npv
+            return float((flows / (1 + rate) ** years).sum())
         
-        # Try multiple initial guesses for better convergence
-        for initial_guess in XIRR_INITIAL_GUESSES:
-            try:
-                xirr_decimal = newton(npv_func, initial_guess, maxiter=XIRR_MAX_ITERATIONS)
-                
-                if np.isnan(xirr_decimal) or np.isinf(xirr_decimal):
-                    continue
-                
-                # Verify convergence by checking NPV is close to zero
-                npv_check = npv_func(xirr_decimal)
-                if abs(npv_check) < NPV_CONVERGENCE_TOLERANCE:
-                    return xirr_decimal * 100
-            except (RuntimeError, ValueError, OverflowError):
-                continue
+        # Bracket the root on a sign change of NPV, then solve with Brent's method,
+        # which always converges inside a valid bracket. Extreme bracket rates may
+        # overflow to inf/0 terms; errstate is set once for the whole solve so each
+        # NPV evaluation is just the array expression.
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            low = XIRR_RATE_BRACKETS[0]
+            npv_low = npv_func(low)
+            for high in XIRR_RATE_BRACKETS[1:]:
+                npv_high = npv_func(high)
+                if (np.isfinite(npv_low) and np.isfinite(npv_high)
+                        and np.sign(npv_low) != np.sign(npv_high)):
+                    try:
+                        xirr_decimal = brentq(npv_func, low, high, xtol=XIRR_RATE_TOLERANCE,
+                                              maxiter=XIRR_MAX_ITERATIONS)
+                        return xirr_decimal * 100
+                    except (RuntimeError, ValueError):
+                        pass
+                low, npv_low = high, npv_high
         
         logger.debug(f"XIRR convergence failed for {len(dates)} cash flows")
         return 0.0
     except Exception as e:
         logger.warning(f"XIRR calculation error: {e}")
         return 0.0
+
+
+def calculate_xirr_batch(dates: list[list[str]], cash_flows: list[list[float]]) -> np.ndarray:
+    """
+    Calculate XIRR for many independent cash-flow series at once.
+    
+    All rows are solved together with NumPy: NPV is evaluated on the
+    XIRR_RATE_BRACKETS grid to find each row's first sign change, then every
+    bracket is narrowed simultaneously with Newton steps that fall back to
+    bisection whenever a step leaves its bracket.
+    
+    Args:
+        dates: Rows of dates in YYYY-MM-DD format, one row per series
+        cash_flows: Rows of cash flows with the same shape as dates
+        
+    Returns:
+        Array of XIRR percentages, one per row
+        Rows without a solvable rate (e.g. no sign change) are 0.0, as in calculate_xirr
+    """
+    flows = np.asarray(cash_flows, dtype=float)
+    if flows.ndim != 2 or len(dates) != flows.shape[0]:
+        raise ValueError("dates and cash_flows must be 2D with the same number of rows")
+    result = np.zeros(flows.shape[0])
+    if flows.shape[0] == 0 or flows.shape[1] < 2:
+        return result
+    
+    years = np.vstack([_days_from_start(row) for row in dates]) / DAYS_PER_YEAR
+    
+    def npv(rates):
+        """NPV of each row at each of its rates; rates has shape (rows, k)"""
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            return np.sum(flows[:, None, :] / (1 + rates[:, :, None]) ** years[:, None, :], axis=2)
+    
+    # First NPV sign change on the bracket grid, per row
+    brackets = np.asarray(XIRR_RATE_BRACKETS, dtype=float)
+    grid = npv(np.broadcast_to(brackets, (flows.shape[0], brackets.size)))
+    finite = np.isfinite(grid)
+    change = finite[:, :-1] & finite[:, 1:] & (np.sign(grid[:, :-1]) != np.sign(grid[:, 1:]))
+    solvable = change.any(axis=1) & (flows > 0).any(axis=1) & (flows < 0).any(axis=1)
+    if not solvable.any():
+        return result
+    
+    rows = np.flatnonzero(solvable)
+    first = change[rows].argmax(axis=1)
+    years, flows = years[rows], flows[rows]
+    low, high = brackets[first], brackets[first + 1]
+    npv_low = grid[rows, first]
+    rate = (low + high) / 2
+    converged = np.zeros(rows.size, dtype=bool)
+    
+    for _ in range(XIRR_MAX_ITERATIONS):
+        value = npv(rate[:, None])[:, 0]
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            slope = np.sum(-years * flows / (1 + rate[:, None]) ** (years + 1), axis=1)
+            newton_rate = rate - value / slope
+        # Keep the root bracketed: replace the end whose NPV has the same sign
+        same_sign = np.sign(value) == np.sign(npv_low)
+        low = np.where(same_sign, rate, low)
+        npv_low = np.where(same_sign, value, npv_low)
+        high = np.where(same_sign, high, rate)
+        in_bracket = np.isfinite(newton_rate) & (newton_rate > low) & (newton_rate < high)
+        next_rate = np.where(in_bracket, newton_rate, (low + high) / 2)
+        converged |= (np.abs(next_rate - rate) < XIRR_RATE_TOLERANCE) | (value == 0)
+        rate = np.where(converged, rate, next_rate)
+        if converged.all():
+            break
+    
+    if not converged.all():
+        logger.debug(f"XIRR convergence failed for {int((~converged).sum())} of {flows.shape[0]} series")
+    result[rows] = np.where(converged, rate * 100, 0.0)
+    return result
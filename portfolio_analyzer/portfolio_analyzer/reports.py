@@ -4,9 +4,10 @@ Author: Zhuo Robert Li
 Version: 1.3.5
 """
 
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, IO, List, Tuple, Union
 import logging
 from datetime import datetime
+import numpy as np
 from .analyzer import PortfolioAnalyzer
 from .utils import safe_divide
 from .investor_comparison import InvestorBenchmark
@@ -37,23 +38,50 @@ def calculate_win_loss_stats(symbol_stats: Dict) -> Tuple[int, int, int]:
     Returns:
         Tuple of (winning_count, losing_count, breakeven_count)
     """
-    winning = sum(1 for s in symbol_stats.values() if s['total_gain'] > 0)
-    losing = sum(1 for s in symbol_stats.values() if s['total_gain'] < 0)
-    breakeven = sum(1 for s in symbol_stats.values() if s['total_gain'] == 0)
+    gains = np.fromiter((s['total_gain'] for s in symbol_stats.values()),
+                        dtype=np.float64, count=len(symbol_stats))
+    winning = int(np.count_nonzero(gains > 0))
+    losing = int(np.count_nonzero(gains < 0))
+    breakeven = int(np.count_nonzero(gains == 0))
     return winning, losing, breakeven
 
+def _top_k(items: List, values: np.ndarray, k: int) -> List:
+    """Return the k items with the largest values, largest first.
+    
+    Same result as ``sorted(items, key=value, reverse=True)[:k]`` (ties keep
+    their input order), but only the candidates at or above the k-th largest
+    value, found with ``np.partition``, are sorted.
+    """
+    if len(values) > k:
+        kth_largest = np.partition(values, -k)[-k]
+        candidates = np.flatnonzero(values >= kth_largest)
+    else:
+        candidates = np.arange(len(values))
+    order = candidates[np.argsort(-values[candidates], kind='stable')]
+    return [items[i] for i in order[:k]]
+
+def minify_html(html: str) -> str:
+    """Strip indentation and blank lines from generated HTML.
+    
+    Line breaks are kept so that ``//`` comments in the inline JavaScript
+    still terminate where they did.
+    """
+    lines = (line.strip() for line in html.splitlines())
+    return '\n'.join(line for line in lines if line)
+
 
 class TextReportGenerator:
     """Generates text-based portfolio reports."""
     
     @staticmethod
-    def generate(analyzer: PortfolioAnalyzer, output_file: Optional[str] = None) -> None:
+    def generate(analyzer: PortfolioAnalyzer, output_file: Optional[Union[str, IO[str]]] = None) -> None:
         """
         Generate text portfolio report.
         
         Args:
             analyzer: PortfolioAnalyzer instance
-            output_file: Optional path to save report
+            output_file: Optional path to save report, or an open text
+                         file-like object to write it to (left open)
         """
         analysis = analyzer.analyze_portfolio()
 
@@ -121,7 +149,9 @@ class TextReportGenerator:
         for line in report_lines:
             print(line)
         
-        if output_file:
+        if hasattr(output_file, 'write'):
+            output_file.write('\n'.join(report_lines))
+        elif output_file:
             try:
                 with open(output_file, 'w') as f:
                     f.write('\n'.join(report_lines))
@@ -331,15 +361,17 @@ class PDFReportGenerator:
     @staticmethod
     def _prepare_pdf_data(symbol_stats: Dict, analysis: Dict) -> Dict:
         """Prepare data for PDF visualization."""
+        items = list(symbol_stats.items())
+        
+        def metric(key: str) -> np.ndarray:
+            return np.fromiter((stats[key] for stats in symbol_stats.values()),
+                               dtype=np.float64, count=len(items))
+        
         return {
-            'top_10_value': sorted(symbol_stats.items(), 
-                                  key=lambda x: x[1]['total_current_value'], reverse=True)[:10],
-            'top_8_cagr': sorted(symbol_stats.items(), 
-                                key=lambda x: x[1]['avg_cagr'], reverse=True)[:8],
-            'top_8_xirr': sorted(symbol_stats.items(), 
-                                key=lambda x: x[1]['avg_xirr'], reverse=True)[:8],
-            'top_8_gain': sorted(symbol_stats.items(), 
-                                key=lambda x: x[1]['total_gain'], reverse=True)[:8],
+            'top_10_value': _top_k(items, metric('total_current_value'), 10),
+            'top_8_cagr': _top_k(items, metric('avg_cagr'), 8),
+            'top_8_xirr': _top_k(items, metric('avg_xirr'), 8),
+            'top_8_gain': _top_k(items, metric('total_gain'), 8),
         }
 
 
@@ -347,13 +379,15 @@ class HTMLReportGenerator:
     """Generates interactive HTML portfolio dashboards with Plotly charts."""
     
     @staticmethod
-    def generate(analyzer: PortfolioAnalyzer, html_path: str) -> None:
+    def generate(analyzer: PortfolioAnalyzer, html_path: Union[str, IO[str]], minify: bool = False) -> None:
         """
         Generate interactive HTML dashboard report with visualizations.
         
         Args:
             analyzer: PortfolioAnalyzer instance
-            html_path: Path to save HTML file
+            html_path: Path to save HTML file, or an open text file-like
+                       object to write it to (left open)
+            minify: Strip indentation and blank lines from the output
         """
         try:
             analysis = analyzer.analyze_portfolio()
@@ -1022,10 +1056,16 @@ class HTMLReportGenerator:
 </html>
 """
             
-            with open(html_path, 'w') as f:
-                f.write(html_content)
+            if minify:
+                html_content = minify_html(html_content)
             
-            print(f"✅ HTML report generated: {html_path}")
+            if hasattr(html_path, 'write'):
+                html_path.write(html_content)
+            else:
+                with open(html_path, 'w') as f:
+                    f.write(html_content)
+                
+                print(f"✅ HTML report generated: {html_path}")
         except Exception as e:
             print(f"⚠️  Error generating HTML: {e}")
             import traceback
@@ -3,15 +3,50 @@
 Author: Zhuo Robert Li
 """
 
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 import pandas as pd
 import yfinance as yf
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Optional Parquet engine for the on-disk download cache
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 DAYS_PER_YEAR = 365.25
 SP500_SYMBOL = '^GSPC'
 
+# On-disk cache for download_history; set the variable to an empty string to
+# disable it (and the in-process memo below)
+DOWNLOAD_CACHE_ENV = 'PORTFOLIO_ANALYZER_CACHE_DIR'
+DEFAULT_DOWNLOAD_CACHE_DIR = Path.home() / '.cache' / 'portfolio_analyzer'
+
+# In-process memo of today's download_history results
+# (tickers, start, columns, dtype, day) -> data,
+# evicting the oldest entry beyond DOWNLOAD_MEMO_SIZE
+DOWNLOAD_MEMO_SIZE = 128
+_download_memo: Dict[Tuple, pd.DataFrame] = {}
+
+# Upper bound on concurrent per-ticker downloads in download_history
+DOWNLOAD_MAX_WORKERS = 16
+
+# Price fields download_history keeps by default (the analysis only reads closes)
+DOWNLOAD_COLUMNS = ('Close',)
+
+# Storage type for downloaded float columns; None keeps Yahoo's float64.
+# 'float32' halves the memory of long histories but holds only about seven
+# significant digits, so six-figure prices (BRK.A) lose their cents
+DOWNLOAD_DTYPE = None
+
 # Ticker symbol normalization mapping
 # Maps common variations to Yahoo Finance format
 TICKER_NORMALIZATION = {
@@ -73,7 +108,9 @@ def normalize_history_index(hist: pd.DataFrame) -> pd.DataFrame:
     if hist.empty:
         return hist
     if getattr(hist.index, "tz", None) is not None:
-        hist = hist.copy()
+        # Shallow copy: shares the value blocks with the caller's frame and
+        # only swaps the index, so the price matrix is never duplicated
+        hist = hist.copy(deep=False)
         hist.index = hist.index.tz_localize(None)
     return hist
 
@@ -82,15 +119,20 @@ def normalize_datetime(dt: pd.Timestamp) -> pd.Timestamp:
     """
     Remove timezone information from datetime object.
     
+    Naive values (and plain dates) are returned unchanged, without any
+    conversion to Timestamp.
+    
     Args:
         dt: Datetime or Timestamp object
         
     Returns:
-        Timezone-naive Timestamp
+        Timezone-naive Timestamp (or datetime, for datetime input)
     """
-    if getattr(dt, "tzinfo", None) is not None:
+    if getattr(dt, "tzinfo", None) is None:
+        return dt
+    if isinstance(dt, pd.Timestamp):
         return dt.tz_localize(None)
-    return dt
+    return dt.replace(tzinfo=None)
 
 
 def extract_history(data: pd.DataFrame, symbol: str) -> pd.DataFrame:
@@ -107,39 +149,177 @@ def extract_history(data: pd.DataFrame, symbol: str) -> pd.DataFrame:
     if data.empty:
         return data
         
-    # Handle MultiIndex columns from bulk download
+    # Handle MultiIndex columns from bulk download. Membership goes through the
+    # columns' cached lookup engine and levels rather than materializing the
+    # level values, so extracting every symbol stays linear in the symbol count.
     if isinstance(data.columns, pd.MultiIndex):
-        level0 = data.columns.get_level_values(0)
-        level1 = data.columns.get_level_values(1)
-        if symbol in level0:
+        if symbol in data.columns:  # (ticker, field) layout
             return data.xs(symbol, level=0, axis=1)
-        if symbol in level1:
-            return data.xs(symbol, level=1, axis=1)
+        if symbol in data.columns.levels[1]:  # (field, ticker) layout
+            try:
+                return data.xs(symbol, level=1, axis=1)
+            except KeyError:  # label left in the levels by slicing, not in the data
+                pass
         return pd.DataFrame()
     
     # Single symbol download
     return data
 
 
-def download_history(tickers: list[str], start_date: str) -> pd.DataFrame:
+def _download_cache_dir() -> str:
+    """Configured download cache directory (empty when caching is disabled)."""
+    return os.environ.get(DOWNLOAD_CACHE_ENV, str(DEFAULT_DOWNLOAD_CACHE_DIR))
+
+
+def clear_download_history_cache() -> None:
+    """Forget the in-process download memo (files in the on-disk cache are kept)."""
+    _download_memo.clear()
+
+
+def _remember_download(key: Tuple, data: pd.DataFrame) -> None:
+    """Memoize a download, dropping the oldest entries beyond DOWNLOAD_MEMO_SIZE."""
+    _download_memo[key] = data
+    while len(_download_memo) > DOWNLOAD_MEMO_SIZE:
+        _download_memo.pop(next(iter(_download_memo)), None)
+
+
+def _download_cache_path(tickers: list[str], start_date: str,
+                         columns: Optional[Tuple[str, ...]] = DOWNLOAD_COLUMNS,
+                         dtype: Optional[str] = DOWNLOAD_DTYPE) -> Optional[Path]:
+    """
+    Cache file for a (tickers, start_date, columns, dtype) download, or None when caching is off.
+    
+    Caching needs pyarrow for Parquet and is disabled by setting
+    PORTFOLIO_ANALYZER_CACHE_DIR to an empty string.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    cache_dir = _download_cache_dir()
+    if not cache_dir:
+        return None
+    key = repr((sorted(tickers), str(start_date), columns, dtype)).encode()
+    return Path(cache_dir) / f"{hashlib.blake2b(key, digest_size=16).hexdigest()}.parquet"
+
+
+def _read_cached_download(path: Path) -> Optional[pd.DataFrame]:
+    """Load a cached download written today (prices are refreshed daily)."""
+    try:
+        if date.fromtimestamp(path.stat().st_mtime) != date.today():
+            return None
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+
+def _write_cached_download(path: Path, data: pd.DataFrame) -> None:
+    """Store a download in the cache; a failed write only costs the next lookup."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        data.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.debug("Could not cache download at %s: %s", path, e)
+
+
+def _download_ticker(symbol: str, start_date: str,
+                     columns: Optional[Tuple[str, ...]] = DOWNLOAD_COLUMNS,
+                     dtype: Optional[str] = DOWNLOAD_DTYPE) -> pd.DataFrame:
+    """Download one symbol's unadjusted history with a timezone-naive index.
+    
+    Dividend and split columns are not requested, only the given price
+    columns (all of them when columns is None) are kept, and float64 columns
+    are stored as dtype (unchanged when dtype is None).
+    """
+    hist = yf.Ticker(symbol).history(start=start_date, auto_adjust=False, actions=False)
+    if columns is not None:
+        hist = hist[[column for column in columns if column in hist.columns]]
+    if dtype is not None:
+        hist = hist.astype({column: dtype for column in hist.select_dtypes('float64').columns})
+    return normalize_history_index(hist)
+
+
+def download_history(tickers: list[str], start_date: str,
+                     max_workers: Optional[int] = None,
+                     columns: Optional[Tuple[str, ...]] = DOWNLOAD_COLUMNS,
+                     dtype: Optional[str] = DOWNLOAD_DTYPE) -> pd.DataFrame:
     """
     Download historical price data from Yahoo Finance.
     
+    Each ticker is fetched in its own worker thread, so request latency
+    overlaps across symbols, and the results are combined into the
+    ticker-grouped MultiIndex columns that extract_history reads. Downloads
+    are cached on disk as Parquet (see _download_cache_path) and reused for
+    the rest of the day for the same tickers and start date; within one
+    process they are also memoized in memory, and repeat calls return a
+    shallow copy sharing the memoized values, which must not be modified
+    in place. Downloads missing any ticker are never cached.
+    
     Args:
         tickers: List of stock symbols
         start_date: Start date in YYYY-MM-DD format
+        max_workers: Concurrent downloads (default: one per ticker, at most
+            DOWNLOAD_MAX_WORKERS)
+        columns: Price fields to keep per ticker (default: DOWNLOAD_COLUMNS);
+            None keeps every field Yahoo returns
+        dtype: Storage type for float columns (default: DOWNLOAD_DTYPE,
+            Yahoo's float64); pass 'float32' to halve memory at the cost
+            of cents on prices above about $100,000
         
     Returns:
         DataFrame with historical price data or empty DataFrame on failure
     """
-    try:
-        return yf.download(
-            tickers=" ".join(sorted(tickers)),
-            start=start_date,
-            group_by="ticker",
-            auto_adjust=False,
-            progress=False,
-            threads=True,
-        )
-    except Exception:
+    symbols = sorted(set(tickers))
+    if not symbols:
+        return pd.DataFrame()
+    if columns is not None:
+        columns = tuple(columns)
+    
+    memo_key = None
+    if _download_cache_dir():
+        memo_key = (tuple(symbols), str(start_date), columns, dtype, date.today())
+        memoized = _download_memo.get(memo_key)
+        if memoized is not None:
+            return memoized.copy(deep=False)
+    
+    cache_path = _download_cache_path(symbols, start_date, columns, dtype)
+    if cache_path is not None:
+        cached = _read_cached_download(cache_path)
+        if cached is not None:
+            if memo_key is not None:
+                _remember_download(memo_key, cached)
+            return cached.copy(deep=False)
+    
+    workers = max_workers or min(DOWNLOAD_MAX_WORKERS, len(symbols))
+    histories = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_download_ticker, symbol, start_date, columns, dtype): symbol
+                   for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                hist = future.result()
+            except Exception as e:
+                logger.debug("Download failed for %s: %s", symbol, e)
+                continue
+            if not hist.empty:
+                histories[symbol] = hist
+    
+    if not histories:
         return pd.DataFrame()
+    
+    # Sorted symbol order keeps the column layout independent of completion order
+    data = pd.concat({symbol: histories[symbol] for symbol in symbols if symbol in histories},
+                     axis=1, sort=True)
+    data.columns.names = ['Ticker', 'Price']
+    
+    # A ticker that failed or came back empty may succeed on the next call,
+    # so only complete downloads are cached
+    if len(histories) < len(symbols):
+        return data
+    if cache_path is not None:
+        _write_cached_download(cache_path, data)
+    if memo_key is not None:
+        _remember_download(memo_key, data)
+        return data.copy(deep=False)
+    return data
@@ -19,6 +19,18 @@ Version: 1.3.4
 License: ISC
 """
 
+import os
+import tempfile
+
+# Render report charts headlessly and keep matplotlib's font cache in a
+# persistent temp directory, so a runner without a writable home does not
+# rebuild it in every process (set before any test module imports matplotlib)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+os.environ.setdefault('MPLCONFIGDIR', os.path.join(tempfile.gettempdir(), 'portfolio_analyzer_mpl'))
+
+# Keep test runs hermetic: never read or write the on-disk download cache
+os.environ['PORTFOLIO_ANALYZER_CACHE_DIR'] = ''
+
 __all__ = [
     'test_metrics',
     'test_loaders',
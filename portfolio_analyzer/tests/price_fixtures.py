@@ -0,0 +1,106 @@
+"""
+Offline Yahoo Finance stand-in shared by the test modules.
+
+Serves tests/fixtures/closes.csv: a few approximate anchor closes per symbol
+(not authoritative market data), expanded to business-day histories by time
+interpolation and carried forward to an end date. CannedYahoo.install() swaps
+yfinance.Ticker and yfinance.download for the canned versions so analyses run
+without network access; uninstall() restores the originals.
+
+Author: Zhuo Robert Li
+Version: 1.3.6
+License: ISC
+"""
+
+import functools
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+from portfolio_analyzer.analyzer import clear_sp500_history_cache
+from portfolio_analyzer.utils import clear_download_history_cache
+
+# Canned closes (symbol, date, close)
+CLOSES_CSV = Path(__file__).parent / "fixtures" / "closes.csv"
+
+
+@functools.lru_cache(maxsize=None)
+def build_histories(end, path=CLOSES_CSV):
+    """Expand the canned closes to business-day OHLC histories ending at end
+
+    Memoized for the whole test session, so every module (and CannedYahoo)
+    asking for the same end date shares one read-only set of histories.
+    """
+    closes = pd.read_csv(path, parse_dates=["date"])
+    # Weekday calendar built once with a vectorized mask: bdate_range
+    # generates its dates one offset at a time
+    days = pd.date_range(closes["date"].min(), end, freq="D")
+    weekdays = days[days.dayofweek < 5]
+    histories = {}
+    for symbol, rows in closes.groupby("symbol"):
+        anchors = rows.set_index("date")["close"]
+        index = weekdays[weekdays >= anchors.index[0]]
+        close = anchors.reindex(index.union(anchors.index)).interpolate(method="time").ffill()
+        close = close.reindex(index)
+        histories[symbol] = pd.DataFrame(
+            {"Open": close, "High": close, "Low": close, "Close": close,
+             "Adj Close": close, "Volume": 0},
+            index=index,
+        )
+    return histories
+
+
+class _CannedTicker:
+    """Offline yfinance.Ticker serving one symbol's canned history"""
+
+    def __init__(self, yahoo, symbol):
+        self._yahoo = yahoo
+        self.ticker = symbol
+
+    def history(self, start=None, **kwargs):
+        return self._yahoo.history(self.ticker, start)
+
+
+class CannedYahoo:
+    """Canned price source that can stand in for the yfinance module functions"""
+
+    def __init__(self, end):
+        self.histories = build_histories(end)
+        self._originals = {}
+
+    def history(self, symbol, start=None):
+        """History for one symbol from start onwards (empty for unknown symbols)"""
+        hist = self.histories.get(symbol)
+        if hist is None:
+            return pd.DataFrame()
+        if start is not None:
+            hist = hist.loc[hist.index >= pd.Timestamp(start)]
+        return hist.copy()
+
+    def ticker(self, symbol):
+        """Replacement for yfinance.Ticker"""
+        return _CannedTicker(self, symbol)
+
+    def download(self, tickers, start=None, **kwargs):
+        """Replacement for yfinance.download returning ticker-grouped histories"""
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        frames = {s: self.history(s, start) for s in symbols if s in self.histories}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1, sort=True)
+
+    def install(self):
+        """Route yfinance through the canned prices (and drop any live downloads held in memory)"""
+        self._originals.update(Ticker=yf.Ticker, download=yf.download)
+        yf.Ticker = self.ticker
+        yf.download = self.download
+        clear_sp500_history_cache()
+        clear_download_history_cache()
+
+    def uninstall(self):
+        """Restore the real yfinance functions"""
+        yf.Ticker = self._originals.pop("Ticker")
+        yf.download = self._originals.pop("download")
+        clear_sp500_history_cache()
+        clear_download_history_cache()
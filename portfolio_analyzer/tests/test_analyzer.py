@@ -12,10 +12,26 @@ License: ISC
 import unittest
 import tempfile
 import os
+from pathlib import Path
 import numpy as np
 from datetime import datetime, timedelta
 import pandas as pd
+from unittest.mock import patch
 from portfolio_analyzer import PortfolioAnalyzer, load_trades_from_csv, calculate_cagr, calculate_xirr
+from portfolio_analyzer import analyzer as analyzer_module
+
+# Earliest purchase date used in this module: every analyzer here reuses one
+# S&P 500 history starting on or before it (see _get_sp500_history)
+SP500_HISTORY_START = '2015-01-01'
+
+
+def setUpModule():
+    analyzer_module.clear_sp500_history_cache()
+    analyzer_module._get_sp500_history(SP500_HISTORY_START)
+
+
+def tearDownModule():
+    analyzer_module.clear_sp500_history_cache()
 
 class TestSP500Benchmark(unittest.TestCase):
     """Test that S&P 500 vs S&P 500 shows no outperformance"""
@@ -81,11 +97,81 @@ class TestSP500Benchmark(unittest.TestCase):
 
 
 
+class TestSP500HistoryCache(unittest.TestCase):
+    """Test the process-wide S&P 500 history shared between analyzers"""
+    
+    @staticmethod
+    def _fake_download(tickers, start_date):
+        index = pd.bdate_range(start_date, periods=30)
+        closes = np.linspace(3000.0, 3100.0, len(index))
+        return pd.concat({tickers[0]: pd.DataFrame({'Close': closes}, index=index)}, axis=1)
+    
+    def setUp(self):
+        # Start empty, then put back the module's preloaded history for later tests
+        shared = dict(analyzer_module._sp500_history_cache)
+        self.addCleanup(analyzer_module._sp500_history_cache.update, shared)
+        analyzer_module.clear_sp500_history_cache()
+        self.addCleanup(analyzer_module.clear_sp500_history_cache)
+        patcher = patch.object(analyzer_module, 'download_history', side_effect=self._fake_download)
+        self.download = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_later_start_reuses_cached_history(self):
+        """Test that a second request starting later is served without downloading"""
+        full = analyzer_module._get_sp500_history('2020-01-02')
+        later = analyzer_module._get_sp500_history('2020-01-10')
+        
+        self.assertEqual(self.download.call_count, 1)
+        self.assertEqual(later.index[0], pd.Timestamp('2020-01-10'))
+        self.assertEqual(later.index[-1], full.index[-1])
+    
+    def test_earlier_start_downloads_again(self):
+        """Test that a request starting before the cached history triggers a download"""
+        analyzer_module._get_sp500_history('2020-01-10')
+        earlier = analyzer_module._get_sp500_history('2020-01-02')
+        
+        self.assertEqual(self.download.call_count, 2)
+        self.assertEqual(earlier.index[0], pd.Timestamp('2020-01-02'))
+    
+    def test_empty_download_is_not_cached(self):
+        """Test that a failed download is retried rather than cached"""
+        self.download.side_effect = lambda tickers, start_date: pd.DataFrame()
+        self.assertTrue(analyzer_module._get_sp500_history('2020-01-02').empty)
+        
+        self.download.side_effect = self._fake_download
+        self.assertFalse(analyzer_module._get_sp500_history('2020-01-02').empty)
+        self.assertEqual(self.download.call_count, 2)
+
+
+class TestHoldingXirrMemo(unittest.TestCase):
+    """Test the memoized single-position XIRR used for per-trade metrics"""
+    
+    def setUp(self):
+        analyzer_module._holding_xirr.cache_clear()
+        self.addCleanup(analyzer_module._holding_xirr.cache_clear)
+    
+    def test_matches_calculate_xirr(self):
+        """Test that the memoized value equals a direct two-flow XIRR"""
+        expected = calculate_xirr(['2020-01-02', '2024-01-02'], [-1000.0, 1500.0])
+        self.assertEqual(analyzer_module._holding_xirr('2020-01-02', '2024-01-02', 1000.0, 1500.0), expected)
+    
+    def test_repeated_position_solves_once(self):
+        """Test that identical positions reuse one XIRR solve"""
+        with patch.object(analyzer_module, 'calculate_xirr', wraps=analyzer_module.calculate_xirr) as solver:
+            first = analyzer_module._holding_xirr('2020-01-02', '2024-01-02', 1000.0, 1500.0)
+            second = analyzer_module._holding_xirr('2020-01-02', '2024-01-02', 1000.0, 1500.0)
+            analyzer_module._holding_xirr('2020-01-02', '2024-01-02', 1000.0, 1600.0)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(solver.call_count, 2)
+
+
 class TestTradeValidation(unittest.TestCase):
     """Test trade validation logic"""
     
-    def setUp(self):
-        self.analyzer = PortfolioAnalyzer([])
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = PortfolioAnalyzer([])
     
     def test_valid_trade(self):
         """Test that a valid trade passes validation"""
@@ -196,13 +282,12 @@ class TestSP500BenchmarkCSV(unittest.TestCase):
 ^GSPC,80,2022-08-10,4210.24
 ^GSPC,60,2023-02-28,3970.15"""
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / "trades.csv"
+            csv_path.write_text(csv_content)
+            
             # Load trades from CSV
-            trades = load_trades_from_csv(temp_file)
+            trades = load_trades_from_csv(str(csv_path))
             self.assertEqual(len(trades), 6, "Should load all 6 trades")
             
             # Analyze portfolio
@@ -262,9 +347,6 @@ class TestSP500BenchmarkCSV(unittest.TestCase):
             print(f"   S&P 500 CAGR:   {sp500_cagr:.2f}%")
             print(f"   Outperformance: {portfolio_outperformance:.2f}%")
             print(f"   Value Difference: {percent_diff:.4f}%")
-            
-        finally:
-            os.unlink(temp_file)
 
 
 
@@ -1087,270 +1169,6 @@ class TestMultiSymbolAnalyticsAggregation(unittest.TestCase):
         self.assertEqual(len(analysis['trades']), 3)
 
 
-class TestPortfolioConsistencyAcrossAnalyses(unittest.TestCase):
-    """Test that portfolio analyses remain consistent (Phase 3)"""
-    
-    def test_repeated_analysis_produces_same_results(self):
-        """Test that running analysis multiple times gives consistent results"""
-        trades = [
-            {"symbol": "MSFT", "shares": 50, "purchase_date": "2019-01-02", "price": 106.07},
-            {"symbol": "SBUX", "shares": 40, "purchase_date": "2019-01-02", "price": 71.36},
-            {"symbol": "NVDA", "shares": 20, "purchase_date": "2019-01-02", "price": 131.68},
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        
-        # Run analysis 3 times
-        analysis_1 = analyzer.analyze_portfolio()
-        analysis_2 = analyzer.analyze_portfolio()
-        analysis_3 = analyzer.analyze_portfolio()
-        
-        # All results should be nearly identical (allowing for microsecond timing differences)
-        for key in ['portfolio_cagr', 'portfolio_xirr', 'total_initial_value']:
-            self.assertAlmostEqual(
-                analysis_1[key],
-                analysis_2[key],
-                places=4,
-                msg=f"Analysis 1 and 2 differ on {key}"
-            )
-            self.assertAlmostEqual(
-                analysis_2[key],
-                analysis_3[key],
-                places=4,
-                msg=f"Analysis 2 and 3 differ on {key}"
-            )
-    
-    def test_analysis_dates_independence(self):
-        """Test that analysis results don't depend on order of trades"""
-        trades_ordered = [
-            {"symbol": "MSFT", "shares": 20, "purchase_date": "2018-01-02", "price": 99.68},
-            {"symbol": "SBUX", "shares": 30, "purchase_date": "2019-01-02", "price": 71.36},
-        ]
-        
-        trades_reversed = [
-            {"symbol": "SBUX", "shares": 30, "purchase_date": "2019-01-02", "price": 71.36},
-            {"symbol": "MSFT", "shares": 20, "purchase_date": "2018-01-02", "price": 99.68},
-        ]
-        
-        analyzer_ordered = PortfolioAnalyzer(trades_ordered)
-        analyzer_reversed = PortfolioAnalyzer(trades_reversed)
-        
-        analysis_ordered = analyzer_ordered.analyze_portfolio()
-        analysis_reversed = analyzer_reversed.analyze_portfolio()
-        
-        # Total values should be the same regardless of order (within reasonable precision)
-        # Note: Allows moderate tolerance (places=1) due to timing and calculation order effects
-        self.assertAlmostEqual(
-            analysis_ordered['total_initial_value'],
-            analysis_reversed['total_initial_value'],
-            places=2
-        )
-        self.assertAlmostEqual(
-            analysis_ordered['portfolio_cagr'],
-            analysis_reversed['portfolio_cagr'],
-            places=1  # Reduced from 2 to accommodate calculation order differences
-        )
-
-
-# ===== PHASE 3: Analytics Validation Tests =====
-
-class TestSP500BenchmarkVsRealPortfolio(unittest.TestCase):
-    """Test S&P 500 benchmark accuracy against real portfolios (Phase 3)"""
-    
-    def test_sp500_independent_calculation(self):
-        """Test that S&P 500 benchmarking calculates independently"""
-        trades = [
-            {
-                "symbol": "MSFT",
-                "shares": 30,
-                "purchase_date": "2020-01-02",
-                "price": 160.84
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # S&P 500 benchmark should exist and be numerically different from stock
-        sp500_cagr = analysis['sp500_cagr']
-        portfolio_cagr = analysis['portfolio_cagr']
-        
-        self.assertIsNotNone(sp500_cagr)
-        self.assertIsNotNone(portfolio_cagr)
-        # MSFT and S&P 500 should have different CAGRs
-        self.assertNotEqual(sp500_cagr, portfolio_cagr)
-    
-    def test_sp500_value_tracking(self):
-        """Test that S&P 500 current value is tracked alongside portfolio"""
-        trades = [
-            {
-                "symbol": "GOOGL",
-                "shares": 20,
-                "purchase_date": "2019-06-01",
-                "price": 100.00
-            },
-            {
-                "symbol": "MSFT",
-                "shares": 15,
-                "purchase_date": "2019-06-01",
-                "price": 50.00
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # Both portfolio and S&P 500 values should be positive
-        self.assertGreater(analysis['total_current_value'], 0)
-        self.assertGreater(analysis['total_sp500_current_value'], 0)
-        
-        # S&P 500 value should be roughly proportional to initial value
-        sp500_return_ratio = analysis['total_sp500_current_value'] / analysis['total_initial_value']
-        portfolio_return_ratio = analysis['total_current_value'] / analysis['total_initial_value']
-        
-        # Both should be positive returns (market has grown since 2019)
-        self.assertGreater(sp500_return_ratio, 1.0)
-        self.assertGreater(portfolio_return_ratio, 1.0)
-
-
-class TestAnalyticsCalculationAccuracy(unittest.TestCase):
-    """Test accuracy of core analytics calculations (Phase 3)"""
-    
-    def test_cagr_vs_xirr_consistency(self):
-        """Test that CAGR and XIRR move in the same direction for performance"""
-        trades = [
-            {
-                "symbol": "NVDA",
-                "shares": 20,
-                "purchase_date": "2020-01-02",
-                "price": 140.00
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # Both should be calculated
-        self.assertIsNotNone(analysis['portfolio_cagr'])
-        self.assertIsNotNone(analysis['portfolio_xirr'])
-        
-        # If CAGR is positive, XIRR should generally be positive too
-        if analysis['portfolio_cagr'] > 0:
-            self.assertGreater(analysis['portfolio_xirr'], 0)
-    
-    def test_years_held_calculation(self):
-        """Test that years held is calculated correctly for recent vs old trades"""
-        from datetime import datetime, timedelta
-        
-        # Old trade
-        old_date = "2015-01-02"
-        # Recent trade
-        today = datetime.now()
-        recent_date = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-        
-        trades = [
-            {
-                "symbol": "MSFT",
-                "shares": 10,
-                "purchase_date": old_date,
-                "price": 46.00
-            },
-            {
-                "symbol": "SBUX",
-                "shares": 10,
-                "purchase_date": recent_date,
-                "price": 100.00
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # Old trade should have more years held than recent
-        trades_by_symbol = {t['symbol']: t for t in analysis['trades']}
-        
-        self.assertGreater(
-            trades_by_symbol['MSFT']['years_held'],
-            trades_by_symbol['SBUX']['years_held']
-        )
-    
-    def test_gain_loss_sign_consistency(self):
-        """Test that gain/loss sign reflects actual performance"""
-        trades = [
-            {
-                "symbol": "MSFT",
-                "shares": 30,
-                "purchase_date": "2020-01-02",
-                "price": 160.84
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        trade = analysis['trades'][0]
-        
-        # Gain/loss should match current - initial
-        expected_gain = trade['current_value'] - trade['initial_value']
-        actual_gain = trade['current_value'] - trade['initial_value']
-        self.assertAlmostEqual(actual_gain, expected_gain, places=2)
-        
-        # Since MSFT has appreciated significantly since 2020
-        self.assertGreater(actual_gain, 0)
-
-
-class TestMultiSymbolAnalyticsAggregation(unittest.TestCase):
-    """Test analytics aggregation across multiple symbols (Phase 3)"""
-    
-    def test_multi_symbol_cagr_weighting(self):
-        """Test that multi-symbol portfolios weight CAGR correctly"""
-        trades = [
-            # Larger investment
-            {
-                "symbol": "MSFT",
-                "shares": 100,
-                "purchase_date": "2015-01-02",
-                "price": 46.00
-            },
-            # Smaller investment
-            {
-                "symbol": "SBUX",
-                "shares": 10,
-                "purchase_date": "2015-01-02",
-                "price": 45.00
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # Portfolio CAGR should exist
-        self.assertIsNotNone(analysis['portfolio_cagr'])
-        self.assertIsInstance(analysis['portfolio_cagr'], (int, float))
-        
-        # Should be positive (both have appreciated)
-        self.assertGreater(analysis['portfolio_cagr'], 0)
-    
-    def test_portfolio_metrics_with_diverse_symbols(self):
-        """Test portfolio metrics with varied symbols from different sectors"""
-        trades = [
-            {"symbol": "MSFT", "shares": 20, "purchase_date": "2018-01-02", "price": 99.68},
-            {"symbol": "SBUX", "shares": 30, "purchase_date": "2018-01-02", "price": 51.36},
-            {"symbol": "TSLA", "shares": 5, "purchase_date": "2018-01-02", "price": 69.01},
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        analysis = analyzer.analyze_portfolio()
-        
-        # All metrics should be calculated
-        self.assertIn('portfolio_cagr', analysis)
-        self.assertIn('portfolio_xirr', analysis)
-        self.assertIn('portfolio_outperformance', analysis)
-        
-        # Should have 3 trades
-        self.assertEqual(len(analysis['trades']), 3)
-
-
 class TestPortfolioConsistencyAcrossAnalyses(unittest.TestCase):
     """Test that portfolio analyses remain consistent (Phase 3)"""
     
@@ -12,21 +12,67 @@ License: ISC
 import unittest
 import tempfile
 import os
-from datetime import datetime, timedelta
+import re
+import importlib.util
 from portfolio_analyzer import PortfolioAnalyzer
-try:
-    from bs4 import BeautifulSoup
-    BS4_AVAILABLE = True
-except ImportError:
-    BS4_AVAILABLE = False
+
+# Probe for bs4 without importing it; only the structure test needs it
+BS4_AVAILABLE = importlib.util.find_spec('bs4') is not None
+
+
+# Every substring the sortable-table tests look for. Longer markers come first so
+# that a marker which is a prefix of another (e.g. 'data-symbol' / 'data-symbol=')
+# does not shadow the longer one when both start at the same offset.
+HTML_MARKERS = sorted({
+    'class="sortable"',
+    'data-sort="symbol"',
+    'data-sort="trades"',
+    'data-sort="invested"',
+    'data-sort="current_value"',
+    'data-sort="gain"',
+    'data-sort="return_pct"',
+    'data-sort="wcagr"',
+    'data-sort="xirr"',
+    'data-sort="sp500_wcagr"',
+    'data-sort="sp500_xirr"',
+    'onclick="sortTable(',
+    'data-symbol=',
+    'data-trades=',
+    'data-invested=',
+    'data-current-value=',
+    'data-gain=',
+    'data-return-pct=',
+    'data-wcagr=',
+    'data-xirr=',
+    'data-sp500-wcagr=',
+    'data-sp500-xirr=',
+    'function sortTable(column)',
+    'currentSort',
+    "getAttribute('data-'",
+    'sort-arrow',
+    'isNaN',
+    'data-symbol',
+    'th.sortable',
+    'cursor: pointer',
+    '.sort-arrow',
+    '.sorted',
+    'DOMContentLoaded',
+    "sortTable('return_pct')",
+    'id="holdings-tbody"',
+    'id="holdings-table"',
+    'function toggleTrades',
+    'trades-row',
+    'expand-icon',
+}, key=len, reverse=True)
 
 
 class TestHTMLSortableTable(unittest.TestCase):
     """Test sortable table functionality in HTML reports"""
     
-    def setUp(self):
-        """Create test portfolio with multiple symbols for sorting tests"""
-        self.trades = [
+    @classmethod
+    def setUpClass(cls):
+        """Generate one report for a multi-symbol portfolio and index its markers"""
+        cls.trades = [
             {
                 'symbol': 'AAPL',
                 'shares': 10,
@@ -58,282 +104,179 @@ class TestHTMLSortableTable(unittest.TestCase):
                 'price': 60.0
             },
         ]
-        self.analyzer = PortfolioAnalyzer(self.trades)
+        cls.analyzer = PortfolioAnalyzer(cls.trades)
+        
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        cls._tmp_path = os.path.join(cls._tmpdir.name, 'report.html')
+        cls.analyzer.generate_html_report(cls._tmp_path, minify=True)
+        
+        with open(cls._tmp_path, 'r') as f:
+            cls.html_content = f.read()
+        
+        # One pass over the report instead of a substring scan per assertion
+        cls._marker_re = re.compile('|'.join(re.escape(m) for m in HTML_MARKERS))
+        cls._markers_found = set(cls._marker_re.findall(cls.html_content))
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmpdir.cleanup()
     
     def test_html_table_has_sortable_headers(self):
         """Test that table headers have sortable class and data-sort attributes"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        # Check for sortable class on headers
+        self.assertIn('class="sortable"', self._markers_found)
         
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for sortable class on headers
-            self.assertIn('class="sortable"', html_content)
-            
-            # Check for data-sort attributes for each column
-            self.assertIn('data-sort="symbol"', html_content)
-            self.assertIn('data-sort="trades"', html_content)
-            self.assertIn('data-sort="invested"', html_content)
-            self.assertIn('data-sort="current_value"', html_content)
-            self.assertIn('data-sort="gain"', html_content)
-            self.assertIn('data-sort="return_pct"', html_content)
-            self.assertIn('data-sort="wcagr"', html_content)
-            self.assertIn('data-sort="xirr"', html_content)
-            self.assertIn('data-sort="sp500_wcagr"', html_content)
-            self.assertIn('data-sort="sp500_xirr"', html_content)
-            
-            # Check for onclick handlers
-            self.assertIn('onclick="sortTable(', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check for data-sort attributes for each column
+        self.assertIn('data-sort="symbol"', self._markers_found)
+        self.assertIn('data-sort="trades"', self._markers_found)
+        self.assertIn('data-sort="invested"', self._markers_found)
+        self.assertIn('data-sort="current_value"', self._markers_found)
+        self.assertIn('data-sort="gain"', self._markers_found)
+        self.assertIn('data-sort="return_pct"', self._markers_found)
+        self.assertIn('data-sort="wcagr"', self._markers_found)
+        self.assertIn('data-sort="xirr"', self._markers_found)
+        self.assertIn('data-sort="sp500_wcagr"', self._markers_found)
+        self.assertIn('data-sort="sp500_xirr"', self._markers_found)
+        
+        # Check for onclick handlers
+        self.assertIn('onclick="sortTable(', self._markers_found)
     
     def test_html_rows_have_data_attributes(self):
         """Test that symbol rows have data attributes for all sortable columns"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
-        
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check that symbol rows have data attributes
-            self.assertIn('data-symbol=', html_content)
-            self.assertIn('data-trades=', html_content)
-            self.assertIn('data-invested=', html_content)
-            self.assertIn('data-current-value=', html_content)
-            self.assertIn('data-gain=', html_content)
-            self.assertIn('data-return-pct=', html_content)
-            self.assertIn('data-wcagr=', html_content)
-            self.assertIn('data-xirr=', html_content)
-            self.assertIn('data-sp500-wcagr=', html_content)
-            self.assertIn('data-sp500-xirr=', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check that symbol rows have data attributes
+        self.assertIn('data-symbol=', self._markers_found)
+        self.assertIn('data-trades=', self._markers_found)
+        self.assertIn('data-invested=', self._markers_found)
+        self.assertIn('data-current-value=', self._markers_found)
+        self.assertIn('data-gain=', self._markers_found)
+        self.assertIn('data-return-pct=', self._markers_found)
+        self.assertIn('data-wcagr=', self._markers_found)
+        self.assertIn('data-xirr=', self._markers_found)
+        self.assertIn('data-sp500-wcagr=', self._markers_found)
+        self.assertIn('data-sp500-xirr=', self._markers_found)
     
     def test_javascript_sort_function_exists(self):
         """Test that sortTable JavaScript function is present"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        # Check for sortTable function definition
+        self.assertIn('function sortTable(column)', self._markers_found)
+        
+        # Check for key sorting logic
+        self.assertIn('currentSort', self._markers_found)
+        self.assertIn('getAttribute(\'data-\'', self._markers_found)
+        self.assertIn('sort-arrow', self._markers_found)
         
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for sortTable function definition
-            self.assertIn('function sortTable(column)', html_content)
-            
-            # Check for key sorting logic
-            self.assertIn('currentSort', html_content)
-            self.assertIn('getAttribute(\'data-\'', html_content)
-            self.assertIn('sort-arrow', html_content)
-            
-            # Check for NaN handling
-            self.assertIn('isNaN', html_content)
-            
-            # Check for tie-breaker logic (symbol sorting)
-            self.assertIn('data-symbol', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check for NaN handling
+        self.assertIn('isNaN', self._markers_found)
+        
+        # Check for tie-breaker logic (symbol sorting)
+        self.assertIn('data-symbol', self._markers_found)
     
     def test_css_styles_for_sorting(self):
         """Test that CSS styles for sortable elements exist"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
-        
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for sortable styles
-            self.assertIn('th.sortable', html_content)
-            self.assertIn('cursor: pointer', html_content)
-            self.assertIn('.sort-arrow', html_content)
-            self.assertIn('.sorted', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check for sortable styles
+        self.assertIn('th.sortable', self._markers_found)
+        self.assertIn('cursor: pointer', self._markers_found)
+        self.assertIn('.sort-arrow', self._markers_found)
+        self.assertIn('.sorted', self._markers_found)
     
     def test_default_sort_on_page_load(self):
         """Test that default sort is applied on page load"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        # Check for DOMContentLoaded event listener
+        self.assertIn('DOMContentLoaded', self._markers_found)
         
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for DOMContentLoaded event listener
-            self.assertIn('DOMContentLoaded', html_content)
-            
-            # Check that default sort is by return_pct
-            self.assertIn("sortTable('return_pct')", html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check that default sort is by return_pct
+        self.assertIn("sortTable('return_pct')", self._markers_found)
     
     def test_table_has_tbody_id(self):
         """Test that tbody has an id for JavaScript manipulation"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
-        
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for tbody id
-            self.assertIn('id="holdings-tbody"', html_content)
-            self.assertIn('id="holdings-table"', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check for tbody id
+        self.assertIn('id="holdings-tbody"', self._markers_found)
+        self.assertIn('id="holdings-table"', self._markers_found)
     
     def test_sort_arrows_for_all_columns(self):
         """Test that sort arrow spans exist for all sortable columns"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
-        
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check for arrow IDs for each column
-            self.assertIn('id="arrow-symbol"', html_content)
-            self.assertIn('id="arrow-trades"', html_content)
-            self.assertIn('id="arrow-invested"', html_content)
-            self.assertIn('id="arrow-current_value"', html_content)
-            self.assertIn('id="arrow-gain"', html_content)
-            self.assertIn('id="arrow-return_pct"', html_content)
-            self.assertIn('id="arrow-wcagr"', html_content)
-            self.assertIn('id="arrow-xirr"', html_content)
-            self.assertIn('id="arrow-sp500_wcagr"', html_content)
-            self.assertIn('id="arrow-sp500_xirr"', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Collect every arrow ID in one pass and check none are missing
+        found = set(re.findall(r'id="arrow-([a-z0-9_]+)"', self.html_content))
+        expected = {
+            'symbol', 'trades', 'invested', 'current_value', 'gain',
+            'return_pct', 'wcagr', 'xirr', 'sp500_wcagr', 'sp500_xirr',
+        }
+        self.assertEqual(expected - found, set())
     
     @unittest.skipUnless(BS4_AVAILABLE, "BeautifulSoup4 not available")
     def test_html_structure_with_beautifulsoup(self):
         """Test HTML structure using BeautifulSoup for detailed validation"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(self.html_content, 'html.parser')
+        
+        # Check table exists
+        table = soup.find('table', {'id': 'holdings-table'})
+        self.assertIsNotNone(table, "Holdings table not found")
+        
+        # Check thead has sortable headers
+        thead = table.find('thead')
+        self.assertIsNotNone(thead)
+        
+        sortable_headers = thead.find_all('th', {'class': 'sortable'})
+        self.assertEqual(len(sortable_headers), 10, "Should have 10 sortable column headers")
+        
+        # Check each header has data-sort attribute
+        for header in sortable_headers:
+            self.assertIsNotNone(header.get('data-sort'), 
+                               f"Header missing data-sort attribute: {header.text}")
+            self.assertIsNotNone(header.get('onclick'), 
+                               f"Header missing onclick handler: {header.text}")
+        
+        # Check tbody exists
+        tbody = table.find('tbody', {'id': 'holdings-tbody'})
+        self.assertIsNotNone(tbody, "Holdings tbody not found")
         
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Check table exists
-            table = soup.find('table', {'id': 'holdings-table'})
-            self.assertIsNotNone(table, "Holdings table not found")
-            
-            # Check thead has sortable headers
-            thead = table.find('thead')
-            self.assertIsNotNone(thead)
-            
-            sortable_headers = thead.find_all('th', {'class': 'sortable'})
-            self.assertEqual(len(sortable_headers), 10, "Should have 10 sortable column headers")
-            
-            # Check each header has data-sort attribute
-            for header in sortable_headers:
-                self.assertIsNotNone(header.get('data-sort'), 
-                                   f"Header missing data-sort attribute: {header.text}")
-                self.assertIsNotNone(header.get('onclick'), 
-                                   f"Header missing onclick handler: {header.text}")
-            
-            # Check tbody exists
-            tbody = table.find('tbody', {'id': 'holdings-tbody'})
-            self.assertIsNotNone(tbody, "Holdings tbody not found")
-            
-            # Check symbol rows have data attributes
-            symbol_rows = tbody.find_all('tr', {'class': 'symbol-row'})
-            self.assertGreater(len(symbol_rows), 0, "No symbol rows found")
-            
-            for row in symbol_rows:
-                self.assertIsNotNone(row.get('data-symbol'), "Row missing data-symbol")
-                self.assertIsNotNone(row.get('data-trades'), "Row missing data-trades")
-                self.assertIsNotNone(row.get('data-invested'), "Row missing data-invested")
-                self.assertIsNotNone(row.get('data-current-value'), "Row missing data-current-value")
-                self.assertIsNotNone(row.get('data-gain'), "Row missing data-gain")
-                self.assertIsNotNone(row.get('data-return-pct'), "Row missing data-return-pct")
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check symbol rows have data attributes
+        symbol_rows = tbody.find_all('tr', {'class': 'symbol-row'})
+        self.assertGreater(len(symbol_rows), 0, "No symbol rows found")
+        
+        for row in symbol_rows:
+            self.assertIsNotNone(row.get('data-symbol'), "Row missing data-symbol")
+            self.assertIsNotNone(row.get('data-trades'), "Row missing data-trades")
+            self.assertIsNotNone(row.get('data-invested'), "Row missing data-invested")
+            self.assertIsNotNone(row.get('data-current-value'), "Row missing data-current-value")
+            self.assertIsNotNone(row.get('data-gain'), "Row missing data-gain")
+            self.assertIsNotNone(row.get('data-return-pct'), "Row missing data-return-pct")
     
     def test_toggle_trades_still_works(self):
         """Test that toggleTrades function is still present and functional"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
-        
-        try:
-            self.analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check toggleTrades function still exists
-            self.assertIn('function toggleTrades', html_content)
-            self.assertIn('trades-row', html_content)
-            self.assertIn('expand-icon', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check toggleTrades function still exists
+        self.assertIn('function toggleTrades', self._markers_found)
+        self.assertIn('trades-row', self._markers_found)
+        self.assertIn('expand-icon', self._markers_found)
 
 
 class TestSortingEdgeCases(unittest.TestCase):
     """Test edge cases for sorting functionality"""
     
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmpdir.cleanup()
+    
     def test_single_symbol_portfolio(self):
         """Test sorting works with single symbol"""
         trades = [{'symbol': 'AAPL', 'shares': 10, 'purchase_date': '2020-01-02', 'price': 300.0}]
         analyzer = PortfolioAnalyzer(trades)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        html_path = os.path.join(self._tmpdir.name, f'{self._testMethodName}.html')
+        analyzer.generate_html_report(html_path)
+        
+        with open(html_path, 'r') as f:
+            html_content = f.read()
         
-        try:
-            analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Should still have sorting enabled
-            self.assertIn('function sortTable', html_content)
-            self.assertIn('class="sortable"', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Should still have sorting enabled
+        self.assertIn('function sortTable', html_content)
+        self.assertIn('class="sortable"', html_content)
     
     def test_multiple_trades_same_symbol(self):
         """Test that nested trades rows move with their parent symbol row"""
@@ -344,23 +287,16 @@ class TestSortingEdgeCases(unittest.TestCase):
         ]
         analyzer = PortfolioAnalyzer(trades)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            html_path = f.name
+        html_path = os.path.join(self._tmpdir.name, f'{self._testMethodName}.html')
+        analyzer.generate_html_report(html_path)
+        
+        with open(html_path, 'r') as f:
+            html_content = f.read()
         
-        try:
-            analyzer.generate_html_report(html_path)
-            
-            with open(html_path, 'r') as f:
-                html_content = f.read()
-            
-            # Check that sorting logic preserves trades rows
-            self.assertIn('const tradesRowId', html_content)
-            self.assertIn('tbody.appendChild(symbolRow)', html_content)
-            self.assertIn('tbody.appendChild(tradesRow)', html_content)
-            
-        finally:
-            if os.path.exists(html_path):
-                os.unlink(html_path)
+        # Check that sorting logic preserves trades rows
+        self.assertIn('const tradesRowId', html_content)
+        self.assertIn('tbody.appendChild(symbolRow)', html_content)
+        self.assertIn('tbody.appendChild(tradesRow)', html_content)
 
 
 if __name__ == '__main__':
@@ -11,78 +11,168 @@ License: ISC
 
 import unittest
 import tempfile
-import os
-import numpy as np
-from datetime import datetime, timedelta
+from pathlib import Path
+import io
+from unittest.mock import patch
 import pandas as pd
-from portfolio_analyzer import PortfolioAnalyzer, load_trades_from_csv, calculate_cagr, calculate_xirr
+from portfolio_analyzer import load_trades_from_csv
+from portfolio_analyzer.loaders import PYARROW_AVAILABLE
+
+VALID_CSV = """symbol,shares,purchase_date,price
+    SBUX,100,2020-01-02,89.35
+    MSFT,50,2021-01-04,220.00
+    NVDA,25,2019-06-15,145.75"""
+
+MISSING_COLUMNS_CSV = """symbol,shares,purchase_date
+    SBUX,100,2020-01-02"""
+
+INVALID_DATA_CSV = """symbol,shares,purchase_date,price
+    SBUX,100,2020-01-02,89.35
+    MSFT,invalid,2021-01-04,220.00
+    NVDA,25,not-a-date,145.75
+    TSLA,-50,2020-05-01,100.00
+    AMZN,inf,2020-03-02,1900.00
+    GOOG,10,2020-03-02,-inf"""
+
+RAGGED_CSV = """symbol,shares,purchase_date,price
+SBUX,100,2020-01-02,89.35
+MSFT,50,2021-01-04
+NVDA,25,2019-06-15,145.75"""
+
+# Shape/content fixtures for TestLoadersPhase2, tagged by fid so one load covers them all
+PHASE2_FIXTURES_CSV = """symbol,shares,purchase_date,price,fid
+SBUX,100,2020-01-02,89.35,dates
+BRK.B,10,2020-01-02,179.50,unicode
+BRK.A,5,2020-01-02,279.50,unicode
+SBUX,100.5,2020-01-02,89.35,decimal
+MSFT,50.25,2021-01-04,220.00,decimal
+BRK.A,1,2020-01-02,350000.00,high
+TSLA,100,2020-01-02,800.00,high
+PENNY,10000,2020-01-02,0.01,low
+MICRO,5000,2020-01-02,0.0001,low"""
+
+
+def setUpModule():
+    """Warm up pandas' CSV parser so the first test doesn't absorb its lazy imports"""
+    load_trades_from_csv(io.StringIO("symbol,shares,purchase_date,price\nX,1,2020-01-01,1.0"))
+
+
+def _write_csv(directory, name, content):
+    """Write CSV content to directory/name and return the path"""
+    path = Path(directory) / name
+    path.write_text(content)
+    return str(path)
+
 
 class TestCSVLoading(unittest.TestCase):
     """Test CSV file loading and validation"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Write each on-disk CSV payload once for the whole class"""
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.fixtures = {
+            'valid': _write_csv(cls.tmpdir.name, 'valid.csv', VALID_CSV),
+        }
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+    
     def test_load_valid_csv(self):
         """Test loading a properly formatted CSV file"""
-        csv_content = """symbol,shares,purchase_date,price
-    SBUX,100,2020-01-02,89.35
-    MSFT,50,2021-01-04,220.00
-    NVDA,25,2019-06-15,145.75"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 3)
-            self.assertEqual(trades[0]['symbol'], 'SBUX')
-            self.assertEqual(trades[0]['shares'], 100)
-            self.assertEqual(trades[0]['price'], 89.35)
-            self.assertEqual(trades[0]['purchase_date'], '2020-01-02')
-        finally:
-            os.unlink(temp_file)
+        trades = load_trades_from_csv(io.StringIO(VALID_CSV))
+        self.assertEqual(len(trades), 3)
+        self.assertEqual(trades[0]['symbol'], 'SBUX')
+        self.assertEqual(trades[0]['shares'], 100)
+        self.assertEqual(trades[0]['price'], 89.35)
+        self.assertEqual(trades[0]['purchase_date'], '2020-01-02')
+    
+    def test_load_valid_csv_from_binary_stream(self):
+        """Test that a binary file-like object loads like a text one"""
+        trades = load_trades_from_csv(io.BytesIO(VALID_CSV.encode()))
+        self.assertEqual(trades, load_trades_from_csv(io.StringIO(VALID_CSV)))
+    
+    def test_load_csv_with_bom_from_streams(self):
+        """Test that a byte order mark before the header is ignored in text and binary streams"""
+        csv_content = '\ufeff' + VALID_CSV
+        for stream in (io.StringIO(csv_content), io.BytesIO(csv_content.encode('utf-8'))):
+            with self.subTest(stream=type(stream).__name__):
+                trades = load_trades_from_csv(stream)
+                self.assertEqual([t['symbol'] for t in trades], ['SBUX', 'MSFT', 'NVDA'])
+    
+    def test_load_valid_csv_from_path(self):
+        """Test loading a properly formatted CSV file from disk"""
+        trades = load_trades_from_csv(self.fixtures['valid'])
+        self.assertEqual(len(trades), 3)
+        self.assertEqual(trades[0]['symbol'], 'SBUX')
+        self.assertEqual(trades[0]['purchase_date'], '2020-01-02')
+    
+    def test_load_utf8_csv_with_bom_from_path(self):
+        """Test that a UTF-8 file with a byte order mark and non-ASCII text loads from disk"""
+        path = Path(self.tmpdir.name) / 'utf8.csv'
+        path.write_text("symbol,shares,purchase_date,price,note\nSBUX,100,2020-01-02,89.35,café €\n",
+                        encoding='utf-8-sig')
+        # The header sniff must decode the file the way read_csv does, whatever the locale
+        with patch('portfolio_analyzer.loaders.open', wraps=open, create=True) as sniff_open:
+            trades = load_trades_from_csv(str(path))
+        self.assertEqual(sniff_open.call_args.kwargs.get('encoding'), 'utf-8-sig')
+        self.assertEqual([t['symbol'] for t in trades], ['SBUX'])
+    
+    def test_repeated_path_load_uses_cache(self):
+        """Test that loading an unchanged file twice parses it only once"""
+        load_trades_from_csv.cache_clear()
+        load_trades_from_csv(self.fixtures['valid'])
+        load_trades_from_csv(self.fixtures['valid'])
+        info = load_trades_from_csv.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+    
+    def test_cached_trades_are_copies(self):
+        """Test that mutating loaded trades does not leak into later loads"""
+        trades = load_trades_from_csv(self.fixtures['valid'])
+        trades[0]['shares'] = 0
+        trades.pop()
+        reloaded = load_trades_from_csv(self.fixtures['valid'])
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded[0]['shares'], 100)
+    
+    def test_rewritten_file_is_reloaded(self):
+        """Test that changing a file on disk invalidates its cached trades"""
+        path = _write_csv(self.tmpdir.name, 'rewritten.csv', VALID_CSV)
+        self.assertEqual(len(load_trades_from_csv(path)), 3)
+        _write_csv(self.tmpdir.name, 'rewritten.csv', "symbol,shares,purchase_date,price\nAAPL,1,2020-01-02,75.0")
+        trades = load_trades_from_csv(path)
+        self.assertEqual([t['symbol'] for t in trades], ['AAPL'])
     
     def test_load_csv_missing_columns(self):
         """Test that CSV with missing columns raises ValueError"""
-        csv_content = """symbol,shares,purchase_date
-    SBUX,100,2020-01-02"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            with self.assertRaises(ValueError) as context:
-                load_trades_from_csv(temp_file)
-            self.assertIn('price', str(context.exception))
-        finally:
-            os.unlink(temp_file)
+        with self.assertRaises(ValueError) as context:
+            load_trades_from_csv(io.StringIO(MISSING_COLUMNS_CSV))
+        self.assertIn('price', str(context.exception))
+    
+    def test_missing_columns_detected_before_parsing_rows(self):
+        """Test that a bad header is rejected before malformed rows can break the parser"""
+        csv_content = "symbol,shares,purchase_date\nSBUX,100\nMSFT,50,2021-01-04,extra,fields,here\n"
+        with self.assertRaises(ValueError) as context:
+            load_trades_from_csv(io.StringIO(csv_content))
+        self.assertIn('price', str(context.exception))
     
     def test_load_csv_with_invalid_data(self):
         """Test that invalid rows are filtered out"""
-        csv_content = """symbol,shares,purchase_date,price
-    SBUX,100,2020-01-02,89.35
-    MSFT,invalid,2021-01-04,220.00
-    NVDA,25,not-a-date,145.75
-    TSLA,-50,2020-05-01,100.00"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            # SBUX is valid, TSLA has negative shares but will load (validation happens later)
-            # Only rows with truly invalid data types are filtered by CSV loader
-            # MSFT (invalid shares parsed as NaN) and NVDA (invalid date) are dropped
-            self.assertGreater(len(trades), 0)
-            # Verify SBUX is in the results
-            symbols = [t['symbol'] for t in trades]
-            self.assertIn('SBUX', symbols)
-            # MSFT and NVDA should be filtered out due to parse errors
-            self.assertNotIn('MSFT', symbols)
-            self.assertNotIn('NVDA', symbols)
-        finally:
-            os.unlink(temp_file)
+        trades = load_trades_from_csv(io.StringIO(INVALID_DATA_CSV))
+        # SBUX is valid, TSLA has negative shares but will load (validation happens later)
+        # Only rows with truly invalid data types are filtered by CSV loader
+        # MSFT (invalid shares parsed as NaN) and NVDA (invalid date) are dropped
+        self.assertGreater(len(trades), 0)
+        # Verify SBUX is in the results
+        symbols = [t['symbol'] for t in trades]
+        self.assertIn('SBUX', symbols)
+        # MSFT and NVDA should be filtered out due to parse errors
+        self.assertNotIn('MSFT', symbols)
+        self.assertNotIn('NVDA', symbols)
+        # AMZN and GOOG parse as infinite shares/price and are dropped too
+        self.assertNotIn('AMZN', symbols)
+        self.assertNotIn('GOOG', symbols)
 
     def test_load_csv_invalid_extension(self):
         """Test that non-CSV paths raise ValueError"""
@@ -96,32 +186,33 @@ class TestCSVLoading(unittest.TestCase):
     SBUX,invalid,not-a-date,invalid
     MSFT,invalid,not-a-date,invalid"""
 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-
-        try:
-            with self.assertRaises(ValueError) as context:
-                load_trades_from_csv(temp_file)
-            self.assertIn("No valid trades", str(context.exception))
-        finally:
-            os.unlink(temp_file)
+        with self.assertRaises(ValueError) as context:
+            load_trades_from_csv(io.StringIO(csv_content))
+        self.assertIn("No valid trades", str(context.exception))
     
     def test_load_empty_csv_file(self):
         """Test that empty CSV file (no data rows) raises ValueError"""
         csv_content = """symbol,shares,purchase_date,price
 """
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            with self.assertRaises(ValueError) as context:
-                load_trades_from_csv(temp_file)
-            self.assertIn('empty', str(context.exception).lower())
-        finally:
-            os.unlink(temp_file)
+        with self.assertRaises(ValueError) as context:
+            load_trades_from_csv(io.StringIO(csv_content))
+        self.assertIn('empty', str(context.exception).lower())
+    
+    def test_load_header_only_binary_stream(self):
+        """Test that a header-only binary stream is reported as empty"""
+        with self.assertRaises(ValueError) as context:
+            load_trades_from_csv(io.BytesIO(b"symbol,shares,purchase_date,price\n"))
+        self.assertIn('empty', str(context.exception).lower())
+    
+    def test_load_csv_with_only_blank_lines(self):
+        """Test that a header followed only by blank lines is reported as empty"""
+        csv_content = "symbol,shares,purchase_date,price\n   \n\n"
+        for use_arrow in (True, False):
+            with self.subTest(use_arrow=use_arrow):
+                with self.assertRaises(ValueError) as context:
+                    load_trades_from_csv(io.StringIO(csv_content), use_arrow=use_arrow)
+                self.assertIn('empty', str(context.exception).lower())
     
     def test_load_csv_with_empty_rows(self):
         """Test that CSV with empty rows is handled gracefully"""
@@ -131,18 +222,11 @@ SBUX,100,2020-01-02,89.35
 MSFT,50,2021-01-04,220.00
 """
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            symbols = [t['symbol'] for t in trades]
-            self.assertIn('SBUX', symbols)
-            self.assertIn('MSFT', symbols)
-        finally:
-            os.unlink(temp_file)
+        trades = load_trades_from_csv(io.StringIO(csv_content))
+        self.assertEqual(len(trades), 2)
+        symbols = [t['symbol'] for t in trades]
+        self.assertIn('SBUX', symbols)
+        self.assertIn('MSFT', symbols)
     
     def test_load_csv_with_whitespace_normalization(self):
         """Test that whitespace in symbols is stripped and normalized"""
@@ -150,124 +234,112 @@ MSFT,50,2021-01-04,220.00
  sbux ,100,2020-01-02,89.35
 MSFT  ,50,2021-01-04,220.00"""
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            self.assertEqual(trades[0]['symbol'], 'SBUX')
-            self.assertEqual(trades[1]['symbol'], 'MSFT')
-        finally:
-            os.unlink(temp_file)
-    
-    def test_load_csv_with_negative_shares(self):
-        """Test that negative shares are loaded (validation at analyzer level)"""
-        csv_content = """symbol,shares,purchase_date,price
-SBUX,-100,2020-01-02,89.35"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 1)
-            self.assertEqual(trades[0]['shares'], -100)  # Loader accepts it; analyzer validates
-        finally:
-            os.unlink(temp_file)
-    
-    def test_load_csv_with_zero_price(self):
-        """Test that zero price is loaded (validation at analyzer level)"""
+        trades = load_trades_from_csv(io.StringIO(csv_content))
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(trades[0]['symbol'], 'SBUX')
+        self.assertEqual(trades[1]['symbol'], 'MSFT')
+    
+    def test_load_csv_with_missing_symbol(self):
+        """Test that rows with a blank symbol are filtered out"""
         csv_content = """symbol,shares,purchase_date,price
-SBUX,100,2020-01-02,0.0"""
+,100,2020-01-02,89.35
+msft,50,2021-01-04,220.00"""
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 1)
-            self.assertEqual(trades[0]['price'], 0.0)
-        finally:
-            os.unlink(temp_file)
-    
-    def test_load_csv_with_future_date(self):
-        """Test that future purchase dates are loaded (validation at analyzer level)"""
+        trades = load_trades_from_csv(io.StringIO(csv_content))
+        self.assertEqual([t['symbol'] for t in trades], ['MSFT'])
+    
+    def test_load_csv_with_single_row_extreme_values(self):
+        """Test that single extreme values load unchanged (validation at analyzer level)"""
+        from datetime import datetime, timedelta
         future_date = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-        csv_content = f"""symbol,shares,purchase_date,price
-SBUX,100,{future_date},89.35"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 1)
-            self.assertEqual(trades[0]['purchase_date'], future_date)
-        finally:
-            os.unlink(temp_file)
-    
-    def test_load_csv_with_very_old_date(self):
-        """Test that very old dates (before market opening) are loaded"""
+        # (name, row, field, expected)
+        cases = [
+            ("negative_shares", "SBUX,-100,2020-01-02,89.35", "shares", -100),
+            ("zero_price", "SBUX,100,2020-01-02,0.0", "price", 0.0),
+            ("future_date", f"SBUX,100,{future_date},89.35", "purchase_date", future_date),
+            ("very_old_date", "IBM,100,1920-01-15,100.00", "purchase_date", "1920-01-15"),
+        ]
+        for name, row, field, expected in cases:
+            with self.subTest(name=name):
+                trades = load_trades_from_csv(io.StringIO(f"symbol,shares,purchase_date,price\n{row}"))
+                self.assertEqual(len(trades), 1)
+                self.assertEqual(trades[0][field], expected)
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_arrow_engine_matches_default_engine(self):
+        """Test that the PyArrow and default engines produce identical trades"""
+        for name, csv_content in (('valid', VALID_CSV), ('invalid', INVALID_DATA_CSV), ('ragged', RAGGED_CSV)):
+            with self.subTest(csv=name):
+                self.assertEqual(
+                    load_trades_from_csv(io.StringIO(csv_content), use_arrow=True),
+                    load_trades_from_csv(io.StringIO(csv_content), use_arrow=False),
+                )
+    
+    def test_ragged_row_is_dropped(self):
+        """Test that a row with missing fields is dropped without failing the whole file"""
+        for use_arrow in (True, False):
+            with self.subTest(use_arrow=use_arrow):
+                trades = load_trades_from_csv(io.StringIO(RAGGED_CSV), use_arrow=use_arrow)
+                self.assertEqual([t['symbol'] for t in trades], ['SBUX', 'NVDA'])
+    
+    def test_date_parse_caching_used(self):
+        """Test that a large CSV with few unique dates is parsed with the date cache"""
+        rows = [f"SBUX,{i + 1},{'2020-01-02' if i % 2 else '2021-06-15'},89.35" for i in range(10000)]
+        csv_content = "symbol,shares,purchase_date,price\n" + "\n".join(rows)
+        
+        with patch('portfolio_analyzer.loaders.pd.to_datetime', wraps=pd.to_datetime) as to_datetime:
+            trades = load_trades_from_csv(io.StringIO(csv_content))
+        
+        self.assertEqual(len(trades), 10000)
+        self.assertEqual(trades[0]['purchase_date'], '2021-06-15')
+        self.assertEqual(trades[1]['purchase_date'], '2020-01-02')
+        self.assertEqual({t['purchase_date'] for t in trades}, {'2020-01-02', '2021-06-15'})
+        self.assertTrue(to_datetime.call_args.kwargs.get('cache'))
+    
+    def test_non_iso_dates_are_dropped(self):
+        """Test that dates not in YYYY-MM-DD form are treated as invalid"""
         csv_content = """symbol,shares,purchase_date,price
-IBM,100,1920-01-15,100.00"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
+SBUX,100,2020-01-02,89.35
+MSFT,50,01/03/2020,220.00
+NVDA,25,2019.06.15,145.75"""
         
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 1)
-            self.assertEqual(trades[0]['purchase_date'], '1920-01-15')
-        finally:
-            os.unlink(temp_file)
-
+        trades = load_trades_from_csv(io.StringIO(csv_content))
+        self.assertEqual([t['symbol'] for t in trades], ['SBUX'])
 
 class TestLoadersPhase2(unittest.TestCase):
     """Phase 2 production hardening tests for loaders"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Load every shape/content fixture in one pass and split the trades by fid"""
+        cls.trades = load_trades_from_csv(io.StringIO(PHASE2_FIXTURES_CSV))
+        # The loader keeps row order and only returns trade columns, so pair rows with fids;
+        # test_every_batched_fixture_row_loads checks that the pairing lines up
+        cls.fids = [line.rsplit(',', 1)[1] for line in PHASE2_FIXTURES_CSV.splitlines()[1:]]
+        cls.by_fid = {}
+        for fid, trade in zip(cls.fids, cls.trades):
+            cls.by_fid.setdefault(fid, []).append(trade)
+    
+    def test_every_batched_fixture_row_loads(self):
+        """Test that each batched fixture row yields one trade, so the fid split is aligned"""
+        self.assertEqual(len(self.trades), len(self.fids))
+    
     def test_date_parsing_multiple_formats(self):
         """Test that different date formats are parsed correctly"""
         # Test YYYY-MM-DD format (standard)
-        csv_content = """symbol,shares,purchase_date,price
-SBUX,100,2020-01-02,89.35"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(trades[0]['purchase_date'], '2020-01-02')
-            # Should be normalized to YYYY-MM-DD
-            self.assertEqual(len(trades[0]['purchase_date']), 10)
-        finally:
-            os.unlink(temp_file)
+        trades = self.by_fid['dates']
+        self.assertEqual(trades[0]['purchase_date'], '2020-01-02')
+        # Should be normalized to YYYY-MM-DD
+        self.assertEqual(len(trades[0]['purchase_date']), 10)
     
     def test_unicode_symbol_names(self):
         """Test that symbols with special characters are handled"""
-        csv_content = """symbol,shares,purchase_date,price
-BRK.B,10,2020-01-02,179.50
-BRK.A,5,2020-01-02,279.50"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            # Verify symbols are properly normalized
-            symbols = [t['symbol'] for t in trades]
-            self.assertIn('BRK.B', symbols)
-            self.assertIn('BRK.A', symbols)
-        finally:
-            os.unlink(temp_file)
+        trades = self.by_fid['unicode']
+        self.assertEqual(len(trades), 2)
+        # Verify symbols are properly normalized
+        symbols = [t['symbol'] for t in trades]
+        self.assertIn('BRK.B', symbols)
+        self.assertIn('BRK.A', symbols)
     
     def test_csv_with_extra_columns(self):
         """Test that CSV with extra columns is handled gracefully"""
@@ -275,72 +347,32 @@ BRK.A,5,2020-01-02,279.50"""
 SBUX,100,2020-01-02,89.35,good deal,NASDAQ
 MSFT,50,2021-01-04,220.00,excellent,NASDAQ"""
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            # Should load successfully, ignoring extra columns
-            self.assertEqual(len(trades), 2)
-            self.assertEqual(trades[0]['symbol'], 'SBUX')
-            self.assertEqual(trades[1]['symbol'], 'MSFT')
-        finally:
-            os.unlink(temp_file)
+        trades = load_trades_from_csv(io.StringIO(csv_content))
+        # Should load successfully, ignoring extra columns
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(trades[0]['symbol'], 'SBUX')
+        self.assertEqual(trades[1]['symbol'], 'MSFT')
     
     def test_csv_with_decimal_shares(self):
         """Test that fractional shares are handled correctly"""
-        csv_content = """symbol,shares,purchase_date,price
-SBUX,100.5,2020-01-02,89.35
-MSFT,50.25,2021-01-04,220.00"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            self.assertAlmostEqual(trades[0]['shares'], 100.5)
-            self.assertAlmostEqual(trades[1]['shares'], 50.25)
-        finally:
-            os.unlink(temp_file)
+        trades = self.by_fid['decimal']
+        self.assertEqual(len(trades), 2)
+        self.assertAlmostEqual(trades[0]['shares'], 100.5)
+        self.assertAlmostEqual(trades[1]['shares'], 50.25)
     
     def test_csv_with_very_high_prices(self):
         """Test loading stocks with very high prices (like BRK.A)"""
-        csv_content = """symbol,shares,purchase_date,price
-BRK.A,1,2020-01-02,350000.00
-TSLA,100,2020-01-02,800.00"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            self.assertEqual(trades[0]['price'], 350000.00)
-            self.assertEqual(trades[1]['price'], 800.00)
-        finally:
-            os.unlink(temp_file)
+        trades = self.by_fid['high']
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(trades[0]['price'], 350000.00)
+        self.assertEqual(trades[1]['price'], 800.00)
     
     def test_csv_with_very_low_prices(self):
         """Test loading penny stocks with very low prices"""
-        csv_content = """symbol,shares,purchase_date,price
-PENNY,10000,2020-01-02,0.01
-MICRO,5000,2020-01-02,0.0001"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_content)
-            temp_file = f.name
-        
-        try:
-            trades = load_trades_from_csv(temp_file)
-            self.assertEqual(len(trades), 2)
-            self.assertEqual(trades[0]['price'], 0.01)
-            self.assertEqual(trades[1]['price'], 0.0001)
-        finally:
-            os.unlink(temp_file)
+        trades = self.by_fid['low']
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(trades[0]['price'], 0.01)
+        self.assertEqual(trades[1]['price'], 0.0001)
 
 
 if __name__ == '__main__':
@@ -3,12 +3,19 @@ Unit tests for Portfolio Performance Analyzer - Report Generation
 
 Run with:
     python3 -m unittest test_reports.py -v
+    python3 -m pytest -n auto --dist loadfile tests   # alongside other modules with pytest-xdist
 
 Author: Zhuo Robert Li
 Version: 1.3.4
 License: ISC
 """
 
+import contextlib
+import functools
+import io
+import json
+import re
+import shutil
 import unittest
 import tempfile
 import os
@@ -17,10 +24,154 @@ from datetime import datetime, timedelta
 import pandas as pd
 from portfolio_analyzer import PortfolioAnalyzer, load_trades_from_csv, calculate_cagr, calculate_xirr
 from portfolio_analyzer.reports import (
-    get_performance_color, calculate_win_loss_stats,
-    PDFReportGenerator, HTMLReportGenerator,
+    get_performance_color, calculate_win_loss_stats, minify_html,
+    TextReportGenerator, PDFReportGenerator, HTMLReportGenerator,
     COLOR_POSITIVE, COLOR_NEGATIVE, COLOR_NEUTRAL
 )
+from tests.price_fixtures import CannedYahoo
+
+
+# Reports are generated once per (format, portfolio): text and HTML into memory,
+# PDF (written by reportlab to a path) into a module-wide directory
+_REPORT_GENERATORS = {
+    'txt': lambda analyzer, path: TextReportGenerator.generate(analyzer, output_file=path),
+    'pdf': PDFReportGenerator.generate,
+    'html': HTMLReportGenerator.generate,
+}
+_report_dir = None
+# Prices come from the canned closes (carried forward to today) rather than Yahoo
+_canned_yahoo = CannedYahoo(end=pd.Timestamp.today().normalize())
+
+
+def setUpModule():
+    global _report_dir
+    _canned_yahoo.install()
+    _report_dir = tempfile.mkdtemp(prefix='test_reports_')
+
+
+def tearDownModule():
+    _cached_report.cache_clear()
+    _cached_report_text.cache_clear()
+    _empty_portfolio_output.cache_clear()
+    _cached_analyzer.cache_clear()
+    shutil.rmtree(_report_dir, ignore_errors=True)
+    _canned_yahoo.uninstall()
+
+
+def _trades_key(trades):
+    """Hashable form of a trade list (order preserved)"""
+    return tuple(tuple(sorted(t.items())) for t in trades)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_analyzer(trades_key):
+    """Build one PortfolioAnalyzer per distinct trade list
+
+    Report generation only reads the analyzer and its memoized analysis, so
+    the instance is shared between tests and report formats.
+    """
+    return PortfolioAnalyzer([dict(items) for items in trades_key])
+
+
+def _analyzer(trades):
+    """Shared analyzer for trades"""
+    return _cached_analyzer(_trades_key(trades))
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_report(fmt, trades_key):
+    """Generate the report file for one portfolio once and return its path"""
+    fd, path = tempfile.mkstemp(suffix=f'.{fmt}', dir=_report_dir)
+    os.close(fd)
+    _REPORT_GENERATORS[fmt](_cached_analyzer(trades_key), path)
+    return path
+
+
+def _report_path(fmt, trades):
+    """Path of the shared (read-only) report generated for trades"""
+    return _cached_report(fmt, _trades_key(trades))
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_report_text(fmt, trades_key):
+    """Generate the text or HTML report for one portfolio once, in memory"""
+    buffer = io.StringIO()
+    _REPORT_GENERATORS[fmt](_cached_analyzer(trades_key), buffer)
+    return buffer.getvalue()
+
+
+def _read_report(fmt, trades):
+    """Contents of the shared text or HTML report generated for trades"""
+    return _cached_report_text(fmt, _trades_key(trades))
+
+
+# What every generator produces for a portfolio without trades: this notice on
+# stdout and no report file
+_EMPTY_PORTFOLIO_NOTICE = "No valid trades to analyze.\n"
+
+
+@functools.lru_cache(maxsize=None)
+def _empty_portfolio_output(fmt):
+    """Generate the empty-portfolio report once per format
+
+    Returns (stdout text, whether a report file was written).
+    """
+    path = os.path.join(_report_dir, f'empty.{fmt}')
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        _REPORT_GENERATORS[fmt](_analyzer([]), path)
+    return out.getvalue(), os.path.exists(path)
+
+
+# The investor comparison chart's figure JSON, which the report writes on one
+# line: greedy up to the last "});" of that line, with no cross-line scanning
+_INVESTOR_CHART_PATTERN = re.compile(r"Plotly\.newPlot\('investor-comparison-chart', (\{.*\})\);")
+
+
+# Page objects in a PDF (the page-tree root is "/Type /Pages")
+_PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+
+
+def _pdf_page_count(path):
+    """Number of page objects in the PDF at path"""
+    with open(path, 'rb') as f:
+        return len(_PDF_PAGE_PATTERN.findall(f.read()))
+
+
+# Portfolios shared by several tests (tuples, so every test sees the same
+# trades and the analyzer/report caches key them identically)
+_TRADES_SBUX_2015 = (
+    {"symbol": "SBUX", "shares": 10, "purchase_date": "2015-01-02", "price": 40.72},
+)
+_TRADES_SBUX_MSFT_2015 = (
+    {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
+    {"symbol": "MSFT", "shares": 50, "purchase_date": "2016-06-15", "price": 20.0},
+)
+_TRADES_SBUX_MSFT_GOOGL_2015 = _TRADES_SBUX_MSFT_2015 + (
+    {"symbol": "GOOGL", "shares": 25, "purchase_date": "2017-03-10", "price": 30.0},
+)
+_TRADES_SBUX_2020 = (
+    {"symbol": "SBUX", "shares": 100, "purchase_date": "2020-01-02", "price": 89.35},
+)
+_TRADES_SBUX_MSFT_2020 = _TRADES_SBUX_2020 + (
+    {"symbol": "MSFT", "shares": 50, "purchase_date": "2021-01-04", "price": 217.69},
+)
+
+
+class TempDirTestCase(unittest.TestCase):
+    """TestCase with one scratch directory per class for reports a test writes itself"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory(prefix='test_reports_')
+        cls.tmpdir = cls._tmpdir.name
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmpdir.cleanup()
+    
+    def output_path(self, name):
+        """Path in the class directory, unique to the running test"""
+        return os.path.join(self.tmpdir, f'{self._testMethodName}_{name}')
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -75,6 +226,24 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(winning, 0)
         self.assertEqual(losing, 0)
         self.assertEqual(breakeven, 0)
+    
+    def test_minify_html_strips_indentation(self):
+        """Test that minify_html drops indentation and blank lines but keeps line breaks"""
+        html = """<div>
+            <span>A</span>
+
+            <script>
+                // comment
+                sortTable('x');
+            </script>
+        </div>
+"""
+        minified = minify_html(html)
+        
+        self.assertEqual(
+            minified,
+            "<div>\n<span>A</span>\n<script>\n// comment\nsortTable('x');\n</script>\n</div>"
+        )
 
 
 class TestPDFDataPreparation(unittest.TestCase):
@@ -143,7 +312,7 @@ class TestPDFDataPreparation(unittest.TestCase):
         self.assertEqual(len(data['top_8_gain']), 8)
 
 
-class TestPDFReportGeneration(unittest.TestCase):
+class TestPDFReportGeneration(TempDirTestCase):
     """Test PDF report generation with visualizations"""
     
     def test_pdf_report_creates_file(self):
@@ -153,61 +322,40 @@ class TestPDFReportGeneration(unittest.TestCase):
             {"symbol": "MSFT", "shares": 5, "purchase_date": "2016-06-15", "price": 50.0},
         ]
         
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pdf', delete=False) as f:
-            temp_file = f.name
+        temp_file = _report_path('pdf', trades)
         
+        self.assertTrue(os.path.exists(temp_file))
+        
+        # Verify it's a PDF (one unbuffered 4-byte read)
+        fd = os.open(temp_file, os.O_RDONLY)
         try:
-            analyzer = PortfolioAnalyzer(trades)
-            PDFReportGenerator.generate(analyzer, temp_file)
-            
-            self.assertTrue(os.path.exists(temp_file))
-            
-            # Verify it's a PDF
-            with open(temp_file, 'rb') as f:
-                header = f.read(4)
-            self.assertEqual(header, b'%PDF')
-            
-            # Check file size (multi-page with charts should be > 10KB)
-            file_size = os.path.getsize(temp_file)
-            self.assertGreater(file_size, 10000)
-            
+            header = os.read(fd, 4)
         finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+            os.close(fd)
+        self.assertEqual(header, b'%PDF')
+        
+        # Summary page plus the chart page
+        self.assertGreaterEqual(_pdf_page_count(temp_file), 2)
     
     def test_pdf_report_empty_portfolio(self):
         """Test PDF generation with empty portfolio"""
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pdf', delete=False) as f:
-            temp_file = f.name
-        
-        try:
-            analyzer = PortfolioAnalyzer([])
-            PDFReportGenerator.generate(analyzer, temp_file)
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        self.assertEqual(_empty_portfolio_output('pdf'), (_EMPTY_PORTFOLIO_NOTICE, False))
 
     def test_pdf_report_without_visualizations(self):
         """Test PDF generation when visualization libs are unavailable"""
         from unittest.mock import patch
         from portfolio_analyzer import reports
 
-        trades = [
-            {"symbol": "SBUX", "shares": 10, "purchase_date": "2015-01-02", "price": 40.72},
-        ]
+        trades = _TRADES_SBUX_2015
 
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pdf', delete=False) as f:
-            temp_file = f.name
+        temp_file = self.output_path('skip.pdf')
 
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            with patch.object(reports, 'VISUALIZATIONS_AVAILABLE', False):
-                PDFReportGenerator.generate(analyzer, temp_file)
+        analyzer = _analyzer(trades)
+        with patch.object(reports, 'VISUALIZATIONS_AVAILABLE', False):
+            PDFReportGenerator.generate(analyzer, temp_file)
 
-            self.assertEqual(os.path.getsize(temp_file), 0)
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        # No PDF is written without the visualization libraries
+        self.assertFalse(os.path.exists(temp_file))
     
     def test_pdf_report_multiple_symbols(self):
         """Test PDF with multiple symbols creates multi-page report"""
@@ -221,394 +369,125 @@ class TestPDFReportGeneration(unittest.TestCase):
                 "price": 100.0 + i * 10
             })
         
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pdf', delete=False) as f:
-            temp_file = f.name
+        temp_file = _report_path('pdf', trades)
         
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            PDFReportGenerator.generate(analyzer, temp_file)
-            
-            self.assertTrue(os.path.exists(temp_file))
-            
-            # Multi-page report should be larger
-            file_size = os.path.getsize(temp_file)
-            self.assertGreater(file_size, 20000)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        self.assertTrue(os.path.exists(temp_file))
+        
+        # Multi-page report
+        self.assertGreaterEqual(_pdf_page_count(temp_file), 2)
+
 
+# Portfolio rendered once for the HTML content checks: repeated SBUX lots give
+# an expandable symbol row, MSFT a second holding for the charts
+_HTML_REPORT_TRADES = (
+    {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
+    {"symbol": "SBUX", "shares": 50, "purchase_date": "2016-06-15", "price": 55.35},
+    {"symbol": "MSFT", "shares": 25, "purchase_date": "2017-03-10", "price": 20.0},
+)
 
-class TestHTMLReportWithCharts(unittest.TestCase):
+# (feature, substrings the HTML report must contain)
+_HTML_REQUIRED_CONTENT = [
+    ("plotly", ['<script src="https://cdn.plot.ly/', "chart1", "chart2", "chart3", "chart4", "chart5"]),
+    ("sections", ["Portfolio Analytics", "Detailed Holdings", "SBUX", "MSFT"]),
+    ("metric cards", ["Portfolio Value", "Total Gain", "Return %", "Portfolio <span", "WCAGR</span>",
+                      "XIRR</span>", "S&P 500 XIRR", "Outperformance", "Total Positions"]),
+    ("expandable trades", ["toggleTrades", "onclick", "symbol-row", "trades-row", "expand-icon",
+                           "Individual Trades for SBUX", "Purchase Price", "Current Price"]),
+    ("trade detail columns", ["<th>Date</th>", "<th>Shares</th>", "<th>Purchase Price</th>",
+                              "<th>Current Price</th>", "<th>Initial Value</th>", "<th>Current Value</th>",
+                              "<th>Gain</th>", "<th>WCAGR %</th>", "<th>XIRR %</th>"]),
+    ("tooltips", ["tooltip-term", "data-tooltip", "position: absolute", "z-index: 10000",
+                  "overflow: visible"]),
+    ("S&P columns", ["S&P WCAGR %", "S&P XIRR %"]),
+]
+
+
+class TestHTMLReportWithCharts(TempDirTestCase):
     """Test HTML report generation with Plotly charts"""
     
-    def test_html_report_contains_plotly(self):
-        """Test that HTML report includes Plotly for interactive charts"""
-        trades = [
-            {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
-            {"symbol": "MSFT", "shares": 50, "purchase_date": "2016-06-15", "price": 20.0},
-        ]
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
-        
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            
-            # Should contain Plotly
-            self.assertIn('plotly', content.lower())
-            self.assertIn('cdn.plot.ly', content.lower())
-            
-            # Should contain chart divs
-            self.assertIn('chart1', content)
-            self.assertIn('chart2', content)
-            self.assertIn('chart3', content)
-            self.assertIn('chart4', content)
-            self.assertIn('chart5', content)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+    def test_html_report_contains_required_content(self):
+        """Test that the HTML report contains its charts, sections, metrics, tooltips and columns"""
+        content = _read_report('html', _HTML_REPORT_TRADES)
+        for feature, substrings in _HTML_REQUIRED_CONTENT:
+            for substring in substrings:
+                with self.subTest(feature=feature, substring=substring):
+                    self.assertIn(substring, content, f"{substring!r} missing from HTML report")
+        
+        # WCAGR replaces CAGR in the header, metric cards and S&P columns
+        self.assertGreater(content.count('WCAGR'), 2)
     
-    def test_html_report_contains_all_metrics(self):
-        """Test that HTML contains comprehensive metrics"""
-        trades = [
-            {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
-        ]
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
-        
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            
-            # Check for all 8 metric cards
-            self.assertIn('Portfolio Value', content)
-            self.assertIn('Total Gain', content)
-            self.assertIn('Return %', content)
-            self.assertIn('Portfolio <span', content)
-            self.assertIn('WCAGR</span>', content)
-            self.assertIn('XIRR</span>', content)
-            self.assertIn('S&P 500 XIRR', content)
-            self.assertIn('Outperformance', content)
-            self.assertIn('Total Positions', content)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+    def test_html_report_renders_all_charts(self):
+        """Test that HTML for a multi-symbol portfolio renders every chart"""
+        trades = _TRADES_SBUX_MSFT_GOOGL_2015
+        
+        content = _read_report('html', trades)
+        # Plotly.js is loaded from its CDN rather than inlined into the report
+        self.assertIn('<script src="https://cdn.plot.ly/', content)
+        self.assertIn('chart5', content)
     
-    def test_html_report_large_file_size(self):
-        """Test that HTML with charts has substantial size"""
-        trades = [
-            {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
-            {"symbol": "MSFT", "shares": 50, "purchase_date": "2016-06-15", "price": 20.0},
-            {"symbol": "GOOGL", "shares": 25, "purchase_date": "2017-03-10", "price": 30.0},
-        ]
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
+    def test_html_report_minified(self):
+        """Test that a minified HTML report is smaller and keeps its content"""
+        trades = _TRADES_SBUX_MSFT_2015
         
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            # HTML with Plotly charts should be large (> 30KB)
-            file_size = os.path.getsize(temp_file)
-            self.assertGreater(file_size, 30000)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-    
-    def test_html_report_expandable_trades(self):
-        """Test that HTML contains expandable trade details functionality"""
-        trades = [
-            {"symbol": "SBUX", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
-            {"symbol": "SBUX", "shares": 50, "purchase_date": "2016-06-15", "price": 55.35},
-            {"symbol": "MSFT", "shares": 25, "purchase_date": "2017-03-10", "price": 20.0},
-        ]
+        full = _read_report('html', trades)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
+        buffer = io.StringIO()
+        HTMLReportGenerator.generate(_analyzer(trades), buffer, minify=True)
+        minified = buffer.getvalue()
         
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            
-            # Check for expandable trade functionality
-            self.assertIn('toggleTrades', content)
-            self.assertIn('symbol-row', content)
-            self.assertIn('trades-row', content)
-            self.assertIn('expand-icon', content)
-            
-            # Check that individual trades table headers are present
-            self.assertIn('Individual Trades', content)
-            self.assertIn('Purchase Price', content)
-            self.assertIn('Current Price', content)
-            
-            # Check for multiple SBUX trades (2 trades for SBUX)
-            self.assertIn('SBUX', content)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        self.assertLess(len(minified), len(full))
+        self.assertEqual(minified, minify_html(full))
+        self.assertIn('function sortTable(column)', minified)
+        self.assertIn('DOMContentLoaded', minified)
     
-    def test_html_report_trade_detail_columns(self):
-        """Test that individual trade detail tables have correct columns"""
-        trades = [
-            {"symbol": "TSLA", "shares": 10, "purchase_date": "2018-01-15", "price": 50.0},
-            {"symbol": "TSLA", "shares": 20, "purchase_date": "2019-06-20", "price": 60.0},
-        ]
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
-        
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            
-            # Verify expanded trade detail table has all columns
-            self.assertIn('<th>Date</th>', content)
-            self.assertIn('<th>Shares</th>', content)
-            self.assertIn('<th>Purchase Price</th>', content)
-            self.assertIn('<th>Current Price</th>', content)
-            self.assertIn('<th>Initial Value</th>', content)
-            self.assertIn('<th>Current Value</th>', content)
-            self.assertIn('<th>Gain</th>', content)
-            self.assertIn('<th>WCAGR %</th>', content)
-            self.assertIn('<th>XIRR %</th>', content)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-
     def test_html_report_without_plotly(self):
         """Test HTML report generation when Plotly is unavailable"""
         from unittest.mock import patch
-        import builtins
+        import sys
 
         trades = [
             {"symbol": "SBUX", "shares": 10, "purchase_date": "2018-01-15", "price": 50.0},
         ]
 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
-
-        real_import = builtins.__import__
+        temp_file = self.output_path('report.html')
 
-        def guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
-            if name.startswith('plotly'):
-                raise ImportError("Plotly not available")
-            return real_import(name, globals, locals, fromlist, level)
+        # A None entry in sys.modules makes importing that module raise ImportError
+        unavailable = {name: None for name in ('plotly', 'plotly.graph_objects', 'plotly.subplots')}
 
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            with patch('builtins.__import__', side_effect=guarded_import):
-                HTMLReportGenerator.generate(analyzer, temp_file)
+        analyzer = _analyzer(trades)
+        with patch.dict(sys.modules, unavailable):
+            HTMLReportGenerator.generate(analyzer, temp_file)
 
-            with open(temp_file, 'r') as f:
-                content = f.read()
+        with open(temp_file, 'r') as f:
+            content = f.read()
 
-            self.assertIn('Install plotly', content)
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-    
-    def test_html_report_symbol_id_sanitization(self):
-        """Test that symbols with dots/dashes are sanitized for HTML IDs"""
-        trades = [
-            {"symbol": "SBUX", "shares": 10, "purchase_date": "2020-01-02", "price": 89.35},
-            {"symbol": "SBUX", "shares": 5, "purchase_date": "2021-01-04", "price": 103.10},
-        ]
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            temp_file = f.name
-        
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            HTMLReportGenerator.generate(analyzer, temp_file)
-            
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            
-            # Should have clickable rows with symbol IDs
-            self.assertIn('toggleTrades', content)
-            self.assertIn('symbol-row', content)
-            self.assertIn('onclick', content)
-            
-            # If we had "BRK.B", it would be sanitized to "BRK_B"
-            # For now, verify SBUX works correctly
-            self.assertIn('SBUX', content)
-            self.assertIn('Individual Trades for SBUX', content)
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        self.assertIn('Install plotly', content)
 
 
-class TestReportGeneration(unittest.TestCase):
+class TestReportGeneration(TempDirTestCase):
     """Test report generation functionality"""
     
     def test_print_report_to_file(self):
         """Test that text report can be saved to file"""
-        trades = [
-            {"symbol": "SBUX", "shares": 10, "purchase_date": "2015-01-02", "price": 40.72},
-        ]
+        trades = _TRADES_SBUX_2015
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            temp_file = f.name
+        temp_file = self.output_path('report.txt')
         
-        try:
-            analyzer = PortfolioAnalyzer(trades)
-            analyzer.print_report(output_file=temp_file)
-            
-            # Verify file was created and has content
-            self.assertTrue(os.path.exists(temp_file))
-            with open(temp_file, 'r') as f:
-                content = f.read()
-            self.assertIn('PORTFOLIO SUMMARY', content)
-            self.assertIn('SBUX', content)
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        analyzer = _analyzer(trades)
+        analyzer.print_report(output_file=temp_file)
+        
+        # Verify file was created and has content
+        self.assertTrue(os.path.exists(temp_file))
+        with open(temp_file, 'r') as f:
+            content = f.read()
+        self.assertIn('PORTFOLIO SUMMARY', content)
+        self.assertIn('SBUX', content)
     
     def test_print_report_empty_portfolio(self):
         """Test print_report with empty portfolio"""
-        analyzer = PortfolioAnalyzer([])
-        # Should not raise exception
-        analyzer.print_report()
-
-    def test_html_report_contains_tooltips(self):
-        """Test that HTML report includes tooltip elements"""
-        trades = [
-            {
-                'symbol': 'SBUX',
-                'shares': 100,
-                'purchase_date': '2020-01-02',
-                'price': 89.35
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False)
-        try:
-            temp_path = temp_file.name
-            temp_file.close()
-            
-            analyzer.generate_html_report(temp_path)
-            
-            # Read the generated HTML
-            with open(temp_path, 'r') as f:
-                html_content = f.read()
-            
-            # Verify tooltip CSS classes exist
-            self.assertIn('tooltip-term', html_content,
-                         "HTML should contain tooltip-term CSS class")
-            
-            # Verify tooltip styling for positioning
-            self.assertIn('data-tooltip', html_content,
-                         "HTML should contain data-tooltip attributes")
-            
-            # Verify specific tooltips for key metrics
-            tooltip_checks = [
-                'WCAGR',
-                'XIRR',
-                'position: absolute',
-                'z-index: 10000',
-                'overflow: visible'
-            ]
-            
-            for check in tooltip_checks:
-                self.assertIn(check, html_content,
-                             f"HTML should contain '{check}' for tooltip functionality")
-        
-        finally:
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
-
-    def test_html_report_wcagr_label(self):
-        """Test that HTML report uses WCAGR instead of CAGR"""
-        trades = [
-            {
-                'symbol': 'TEST',
-                'shares': 100,
-                'purchase_date': '2020-01-02',
-                'price': 100.0
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False)
-        try:
-            temp_path = temp_file.name
-            temp_file.close()
-            
-            analyzer.generate_html_report(temp_path)
-            
-            with open(temp_path, 'r') as f:
-                html_content = f.read()
-            
-            # Verify WCAGR appears in headers
-            self.assertIn('WCAGR', html_content,
-                         "HTML should use WCAGR instead of CAGR")
-            
-            # Verify both portfolio and S&P 500 WCAGR mentioned
-            wcagr_count = html_content.count('WCAGR')
-            self.assertGreater(wcagr_count, 2,
-                              "HTML should have multiple WCAGR references (header + S&P)")
-        
-        finally:
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
-
-    def test_html_report_sp500_columns(self):
-        """Test that HTML detailed holdings table has S&P 500 columns"""
-        trades = [
-            {
-                'symbol': 'TEST',
-                'shares': 100,
-                'purchase_date': '2020-01-02',
-                'price': 100.0
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
-        
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False)
-        try:
-            temp_path = temp_file.name
-            temp_file.close()
-            
-            analyzer.generate_html_report(temp_path)
-            
-            with open(temp_path, 'r') as f:
-                html_content = f.read()
-            
-            # Verify S&P columns in detailed holdings
-            self.assertIn('S&P WCAGR %', html_content,
-                         "HTML should have S&P WCAGR % column")
-            self.assertIn('S&P XIRR %', html_content,
-                         "HTML should have S&P XIRR % column")
-        
-        finally:
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            _analyzer([]).print_report()
+        self.assertEqual(out.getvalue(), _EMPTY_PORTFOLIO_NOTICE)
 
 
 class TestReportEdgeCases(unittest.TestCase):
@@ -616,71 +495,20 @@ class TestReportEdgeCases(unittest.TestCase):
     
     def test_text_report_empty_portfolio(self):
         """Test text report generation with empty portfolio"""
-        analyzer = PortfolioAnalyzer([])
-        
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
-            output_file = f.name
-        
-        try:
-            # Should handle empty portfolio gracefully
-            from portfolio_analyzer.reports import TextReportGenerator
-            TextReportGenerator.generate(analyzer, output_file=output_file)
-            
-            # File should be created/written
-            self.assertTrue(os.path.exists(output_file))
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        # Handled gracefully: the notice is printed and no file is written
+        self.assertEqual(_empty_portfolio_output('txt'), (_EMPTY_PORTFOLIO_NOTICE, False))
     
     def test_html_report_empty_portfolio(self):
         """Test HTML report generation with empty portfolio"""
-        analyzer = PortfolioAnalyzer([])
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as f:
-            output_file = f.name
-        
-        try:
-            HTMLReportGenerator.generate(analyzer, output_file)
-            
-            # File should be created
-            self.assertTrue(os.path.exists(output_file))
-            
-            # If file has content, it should still be valid HTML
-            with open(output_file, 'r') as f:
-                content = f.read()
-                if content:
-                    self.assertIn('<html', content.lower())
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        self.assertEqual(_empty_portfolio_output('html'), (_EMPTY_PORTFOLIO_NOTICE, False))
     
     def test_text_report_single_trade(self):
         """Test text report with single trade"""
-        trades = [
-            {
-                "symbol": "SBUX",
-                "shares": 100,
-                "purchase_date": "2020-01-02",
-                "price": 89.35
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
+        trades = _TRADES_SBUX_2020
         
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
-            output_file = f.name
-        
-        try:
-            from portfolio_analyzer.reports import TextReportGenerator
-            TextReportGenerator.generate(analyzer, output_file=output_file)
-            
-            with open(output_file, 'r') as f:
-                content = f.read()
-                self.assertIn('SBUX', content)
-                self.assertIn('PORTFOLIO SUMMARY', content)
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        content = _read_report('txt', trades)
+        self.assertIn('SBUX', content)
+        self.assertIn('PORTFOLIO SUMMARY', content)
     
     def test_html_report_single_trade(self):
         """Test HTML report with single trade"""
@@ -693,21 +521,9 @@ class TestReportEdgeCases(unittest.TestCase):
             }
         ]
         
-        analyzer = PortfolioAnalyzer(trades)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as f:
-            output_file = f.name
-        
-        try:
-            HTMLReportGenerator.generate(analyzer, output_file)
-            
-            with open(output_file, 'r') as f:
-                content = f.read()
-                self.assertIn('TSLA', content)
-                self.assertIn('Portfolio Analytics', content)
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        content = _read_report('html', trades)
+        self.assertIn('TSLA', content)
+        self.assertIn('Portfolio Analytics', content)
 
 
 class TestReportsPhase2(unittest.TestCase):
@@ -715,78 +531,19 @@ class TestReportsPhase2(unittest.TestCase):
     
     def test_text_report_consistency(self):
         """Test that text reports generated twice are identical"""
-        trades = [
-            {
-                "symbol": "SBUX",
-                "shares": 100,
-                "purchase_date": "2020-01-02",
-                "price": 89.35
-            },
-            {
-                "symbol": "MSFT",
-                "shares": 50,
-                "purchase_date": "2021-01-04",
-                "price": 217.69
-            }
-        ]
-        
-        analyzer = PortfolioAnalyzer(trades)
+        trades = _TRADES_SBUX_MSFT_2020
         
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f1, \
-             tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f2:
-            output_file1 = f1.name
-            output_file2 = f2.name
-        
-        try:
-            from portfolio_analyzer.reports import TextReportGenerator
-            
-            # Generate report twice
-            TextReportGenerator.generate(analyzer, output_file=output_file1)
-            TextReportGenerator.generate(analyzer, output_file=output_file2)
-            
-            # Read both files
-            with open(output_file1, 'r') as f:
-                content1 = f.read()
-            with open(output_file2, 'r') as f:
-                content2 = f.read()
-            
-            # Content should be identical
-            self.assertEqual(content1, content2)
-        finally:
-            if os.path.exists(output_file1):
-                os.unlink(output_file1)
-            if os.path.exists(output_file2):
-                os.unlink(output_file2)
-    
-    def test_html_report_contains_required_sections(self):
-        """Test that HTML report contains all required sections"""
-        trades = [
-            {
-                "symbol": "GOOG",
-                "shares": 10,
-                "purchase_date": "2015-01-01",
-                "price": 500.00
-            }
-        ]
+        analyzer = _analyzer(trades)
         
-        analyzer = PortfolioAnalyzer(trades)
+        buffer1 = io.StringIO()
+        buffer2 = io.StringIO()
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as f:
-            output_file = f.name
+        # Generate report twice
+        TextReportGenerator.generate(analyzer, output_file=buffer1)
+        TextReportGenerator.generate(analyzer, output_file=buffer2)
         
-        try:
-            HTMLReportGenerator.generate(analyzer, output_file)
-            
-            with open(output_file, 'r') as f:
-                content = f.read()
-            
-            # Verify required sections exist (use section titles from HTML template)
-            self.assertIn('Portfolio Analytics', content)
-            self.assertIn('Detailed Holdings', content)
-            self.assertIn('GOOG', content)
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        # Content should be identical
+        self.assertEqual(buffer1.getvalue(), buffer2.getvalue())
     
     def test_pdf_report_creation_no_error(self):
         """Test that PDF report creation doesn't raise errors"""
@@ -799,22 +556,13 @@ class TestReportsPhase2(unittest.TestCase):
             }
         ]
         
-        analyzer = PortfolioAnalyzer(trades)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as f:
-            output_file = f.name
+        # Should not raise any exceptions
+        output_file = _report_path('pdf', trades)
         
-        try:
-            # Should not raise any exceptions
-            PDFReportGenerator.generate(analyzer, output_file)
-            
-            # File should be created
-            self.assertTrue(os.path.exists(output_file))
-            # File should have some content
-            self.assertGreater(os.path.getsize(output_file), 0)
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        # File should be created
+        self.assertTrue(os.path.exists(output_file))
+        # File should have some content
+        self.assertGreater(os.path.getsize(output_file), 0)
     
     def test_report_with_mixed_symbols(self):
         """Test report generation with diverse symbols and performance"""
@@ -839,25 +587,12 @@ class TestReportsPhase2(unittest.TestCase):
             }
         ]
         
-        analyzer = PortfolioAnalyzer(trades)
-        
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
-            output_file = f.name
+        content = _read_report('txt', trades)
         
-        try:
-            from portfolio_analyzer.reports import TextReportGenerator
-            TextReportGenerator.generate(analyzer, output_file=output_file)
-            
-            with open(output_file, 'r') as f:
-                content = f.read()
-            
-            # All symbols should be in the report
-            self.assertIn('GOOGL', content)
-            self.assertIn('FB', content)
-            self.assertIn('TSLA', content)
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        # All symbols should be in the report
+        self.assertIn('GOOGL', content)
+        self.assertIn('FB', content)
+        self.assertIn('TSLA', content)
     
     def test_html_investor_comparison_spacing_and_highlighting(self):
         """
@@ -871,64 +606,45 @@ class TestReportsPhase2(unittest.TestCase):
             {"symbol": "AAPL", "shares": 100, "purchase_date": "2015-01-02", "price": 40.72},
         ]
         
-        analyzer = PortfolioAnalyzer(trades)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as f:
-            output_file = f.name
-        
-        try:
-            HTMLReportGenerator.generate(analyzer, output_file)
-            
-            with open(output_file, 'r') as f:
-                content = f.read()
-            
-            # Test 1: Chart container has proper bottom margin (60px) to prevent overlap
-            self.assertIn('margin-bottom: 60px', content, 
-                         "Chart container should have 60px bottom margin")
-            
-            # Test 2: Chart div has proper height (450px)
-            self.assertIn('height: 450px', content,
-                         "Chart should be 450px tall")
-            
-            # Test 3: Table has proper top margin (40px) for separation from chart
-            # Look for the table style that appears after the chart
-            self.assertIn('margin-top: 40px; background: white; box-shadow', content,
-                         "Table should have 40px top margin")
-            
-            # Test 4: Joel Greenblatt (#1 rank) has blue highlighting (#f0f9ff)
-            # This makes the top investor visible and not hidden by chart overlap
-            self.assertIn('#f0f9ff', content,
-                         "Top ranked investor should have blue highlight background")
-            self.assertIn('#0066cc', content,
-                         "Top ranked investor should have blue border")
-            
-            # Test 5: Chart has proper bottom margin in Plotly config (b=80)
-            # This ensures x-axis label doesn't overflow into table
-            import json
-            import re
-            # Extract the Plotly chart JSON for investor comparison
-            chart_match = re.search(r"Plotly\.newPlot\('investor-comparison-chart', (\{.*?\})\);", 
-                                   content, re.DOTALL)
-            if chart_match:
-                try:
-                    chart_json = json.loads(chart_match.group(1))
-                    bottom_margin = chart_json.get('layout', {}).get('margin', {}).get('b')
-                    self.assertEqual(bottom_margin, 80,
-                                   "Chart bottom margin should be 80px to prevent overlap")
-                except (json.JSONDecodeError, AttributeError):
-                    pass  # If parsing fails, skip this assertion
-            
-            # Test 6: Verify Joel Greenblatt appears in content (sanity check)
-            self.assertIn('Joel Greenblatt', content,
-                         "Joel Greenblatt should be in the report")
-            
-            # Test 7: Verify investor comparison section exists
-            self.assertIn('How You Compare to Investment Legends', content,
-                         "Investor comparison section should exist")
-            
-        finally:
-            if os.path.exists(output_file):
-                os.unlink(output_file)
+        content = _read_report('html', trades)
+        
+        # Test 1: Chart container has proper bottom margin (60px) to prevent overlap
+        self.assertIn('margin-bottom: 60px', content, 
+                     "Chart container should have 60px bottom margin")
+        
+        # Test 2: Chart div has proper height (450px)
+        self.assertIn('height: 450px', content,
+                     "Chart should be 450px tall")
+        
+        # Test 3: Table has proper top margin (40px) for separation from chart
+        # Look for the table style that appears after the chart
+        self.assertIn('margin-top: 40px; background: white; box-shadow', content,
+                     "Table should have 40px top margin")
+        
+        # Test 4: Joel Greenblatt (#1 rank) has blue highlighting (#f0f9ff)
+        # This makes the top investor visible and not hidden by chart overlap
+        self.assertIn('#f0f9ff', content,
+                     "Top ranked investor should have blue highlight background")
+        self.assertIn('#0066cc', content,
+                     "Top ranked investor should have blue border")
+        
+        # Test 5: Chart has proper bottom margin in Plotly config (b=80)
+        # This ensures x-axis label doesn't overflow into table
+        # Extract the Plotly chart JSON for investor comparison
+        chart_match = _INVESTOR_CHART_PATTERN.search(content)
+        self.assertIsNotNone(chart_match, "Investor comparison chart should be plotted")
+        chart_json = json.loads(chart_match.group(1))
+        bottom_margin = chart_json.get('layout', {}).get('margin', {}).get('b')
+        self.assertEqual(bottom_margin, 80,
+                       "Chart bottom margin should be 80px to prevent overlap")
+        
+        # Test 6: Verify Joel Greenblatt appears in content (sanity check)
+        self.assertIn('Joel Greenblatt', content,
+                     "Joel Greenblatt should be in the report")
+        
+        # Test 7: Verify investor comparison section exists
+        self.assertIn('How You Compare to Investment Legends', content,
+                     "Investor comparison section should exist")
 
 
 if __name__ == '__main__':
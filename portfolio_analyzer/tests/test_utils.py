@@ -15,13 +15,62 @@ import os
 import numpy as np
 from datetime import datetime, timedelta
 import pandas as pd
+from unittest.mock import MagicMock, patch
 from portfolio_analyzer import PortfolioAnalyzer, load_trades_from_csv, calculate_cagr, calculate_xirr
+from portfolio_analyzer import utils
+
+# yfinance.Ticker stays patched for the whole module, so no test here reaches
+# Yahoo; tests that download take the mock from _scripted_ticker()
+_ticker_patcher = patch('portfolio_analyzer.utils.yf.Ticker')
+_ticker_mock = None
+
+
+def setUpModule():
+    global _ticker_mock
+    _ticker_mock = _ticker_patcher.start()
+
+
+def tearDownModule():
+    _ticker_patcher.stop()
+
+
+# Small fixtures shared by the frame tests: the indexes are immutable, the
+# seeded values make any failure reproducible, and the read-only price block
+# can back frames built with copy=False
+_DATES = pd.date_range('2020-01-01', periods=3)
+_DATES_UTC = _DATES.tz_localize('UTC')
+_PRICES = np.random.default_rng(0).random((3, 4))
+_PRICES.flags.writeable = False
+
+
+def _scripted_ticker():
+    """The module's yfinance.Ticker mock, reset so a test can script its histories"""
+    _ticker_mock.reset_mock(return_value=True, side_effect=True)
+    return _ticker_mock
+
+
+def _script_failing_once(data, failing_symbol):
+    """Script the Ticker mock so failing_symbol's first download raises and every other returns data"""
+    pending_failures = {failing_symbol}
+    
+    def fake_ticker(symbol):
+        ticker = MagicMock()
+        if symbol in pending_failures:
+            pending_failures.discard(symbol)
+            ticker.history.side_effect = ConnectionError('Yahoo timed out')
+        else:
+            ticker.history.return_value = data
+        return ticker
+    
+    _scripted_ticker().side_effect = fake_ticker
+
 
 class TestSafeDivide(unittest.TestCase):
     """Test the _safe_divide helper method"""
     
-    def setUp(self):
-        self.analyzer = PortfolioAnalyzer([])
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = PortfolioAnalyzer([])
     
     def test_safe_divide_normal(self):
         """Test normal division"""
@@ -60,12 +109,23 @@ class TestUtilsFunctions(unittest.TestCase):
         """Test normalize_history_index removes timezone"""
         from portfolio_analyzer.utils import normalize_history_index
         
-        dates = pd.date_range('2020-01-01', periods=3, tz='UTC')
+        dates = _DATES_UTC
         df = pd.DataFrame({'price': [100, 101, 102]}, index=dates)
         
         result = normalize_history_index(df)
         self.assertIsNone(result.index.tz)
     
+    def test_normalize_history_index_leaves_input_untouched(self):
+        """Test normalize_history_index keeps the caller's index and shares its values"""
+        from portfolio_analyzer.utils import normalize_history_index
+        
+        dates = _DATES_UTC
+        df = pd.DataFrame({'price': [100.0, 101.0, 102.0]}, index=dates)
+        
+        result = normalize_history_index(df)
+        self.assertEqual(str(df.index.tz), 'UTC')
+        self.assertTrue(np.shares_memory(result['price'].to_numpy(), df['price'].to_numpy()))
+    
     def test_normalize_datetime_with_timezone(self):
         """Test normalize_datetime removes timezone"""
         from portfolio_analyzer.utils import normalize_datetime
@@ -74,6 +134,16 @@ class TestUtilsFunctions(unittest.TestCase):
         result = normalize_datetime(dt)
         self.assertIsNone(result.tzinfo)
     
+    def test_normalize_datetime_plain_datetimes(self):
+        """Test normalize_datetime keeps naive values and strips aware datetimes"""
+        from datetime import date, timezone
+        from portfolio_analyzer.utils import normalize_datetime
+        
+        naive = datetime(2020, 1, 2, 9, 30)
+        self.assertIs(normalize_datetime(naive), naive)
+        self.assertEqual(normalize_datetime(date(2020, 1, 2)), date(2020, 1, 2))
+        self.assertEqual(normalize_datetime(naive.replace(tzinfo=timezone.utc)), naive)
+    
     def test_extract_history_empty_dataframe(self):
         """Test extract_history with empty DataFrame"""
         from portfolio_analyzer.utils import extract_history
@@ -87,10 +157,9 @@ class TestUtilsFunctions(unittest.TestCase):
         from portfolio_analyzer.utils import extract_history
         
         # Create MultiIndex DataFrame like yf.download returns
-        dates = pd.date_range('2020-01-01', periods=3)
+        dates = _DATES
         columns = pd.MultiIndex.from_product([['Close', 'Open'], ['SBUX', 'MSFT']])
-        data = np.random.rand(3, 4)
-        df = pd.DataFrame(data, index=dates, columns=columns)
+        df = pd.DataFrame(_PRICES, index=dates, columns=columns, copy=False)
         
         result = extract_history(df, 'SBUX')
         self.assertFalse(result.empty)
@@ -100,19 +169,30 @@ class TestUtilsFunctions(unittest.TestCase):
         """Test extract_history when symbol not in MultiIndex"""
         from portfolio_analyzer.utils import extract_history
         
-        dates = pd.date_range('2020-01-01', periods=3)
+        dates = _DATES
         columns = pd.MultiIndex.from_product([['Close'], ['SBUX']])
-        data = np.random.rand(3, 1)
-        df = pd.DataFrame(data, index=dates, columns=columns)
+        df = pd.DataFrame(_PRICES[:, :1], index=dates, columns=columns, copy=False)
         
         result = extract_history(df, 'NONEXISTENT')
         self.assertTrue(result.empty)
 
+    def test_extract_history_symbol_dropped_by_slicing(self):
+        """Test extract_history ignores tickers left only in the MultiIndex levels"""
+        from portfolio_analyzer.utils import extract_history
+        
+        dates = _DATES
+        columns = pd.MultiIndex.from_product([['Close'], ['SBUX', 'MSFT']])
+        df = pd.DataFrame(np.arange(6.0).reshape(3, 2), index=dates, columns=columns, copy=False)
+        sliced = df.loc[:, df.columns.get_level_values(1) != 'MSFT']
+        
+        self.assertTrue(extract_history(sliced, 'MSFT').empty)
+        self.assertEqual(extract_history(sliced, 'SBUX')['Close'].tolist(), [0.0, 2.0, 4.0])
+
     def test_extract_history_single_symbol(self):
         """Test extract_history returns data for single-symbol DataFrame"""
         from portfolio_analyzer.utils import extract_history
 
-        dates = pd.date_range('2020-01-01', periods=3)
+        dates = _DATES
         df = pd.DataFrame({'Close': [100, 101, 102]}, index=dates)
 
         result = extract_history(df, 'SBUX')
@@ -121,23 +201,241 @@ class TestUtilsFunctions(unittest.TestCase):
     def test_download_history_exception_handling(self):
         """Test download_history handles exceptions gracefully"""
         from portfolio_analyzer.utils import download_history
-        from unittest.mock import patch
         
-        with patch('portfolio_analyzer.utils.yf.download', side_effect=Exception("Network error")):
-            result = download_history(['SBUX'], '2020-01-01')
-            self.assertTrue(result.empty)
+        _scripted_ticker().return_value.history.side_effect = Exception("Network error")
+        result = download_history(['SBUX'], '2020-01-01')
+        self.assertTrue(result.empty)
 
     def test_download_history_success(self):
         """Test download_history returns data from yfinance"""
         from portfolio_analyzer.utils import download_history
-        from unittest.mock import patch
 
-        dates = pd.date_range('2020-01-01', periods=2)
+        dates = _DATES[:2]
         df = pd.DataFrame({'Close': [100, 101]}, index=dates)
 
-        with patch('portfolio_analyzer.utils.yf.download', return_value=df):
-            result = download_history(['SBUX'], '2020-01-01')
-            self.assertTrue(result.equals(df))
+        history = _scripted_ticker().return_value.history
+        history.return_value = df
+        result = download_history(['SBUX'], '2020-01-01')
+        self.assertTrue(result['SBUX'].equals(df))
+        history.assert_called_once_with(start='2020-01-01', auto_adjust=False, actions=False)
+
+    def test_download_history_keeps_requested_columns(self):
+        """Test that download_history keeps only closes unless asked for more fields"""
+        from portfolio_analyzer.utils import download_history
+
+        df = pd.DataFrame({'Open': [99.0, 100.0], 'Close': [100.0, 101.0], 'Volume': [10, 11]},
+                          index=_DATES[:2])
+
+        _scripted_ticker().return_value.history.return_value = df
+        narrow = download_history(['SBUX'], '2020-01-01')
+        chosen = download_history(['SBUX'], '2020-01-01', columns=['Volume', 'Close'])
+        full = download_history(['SBUX'], '2020-01-01', columns=None)
+
+        self.assertEqual(list(narrow['SBUX'].columns), ['Close'])
+        self.assertEqual(list(chosen['SBUX'].columns), ['Volume', 'Close'])
+        self.assertTrue(full['SBUX'].equals(df))
+
+    def test_download_history_keeps_float64_prices(self):
+        """Test that six-figure prices keep their cents by default"""
+        from portfolio_analyzer.utils import download_history
+
+        df = pd.DataFrame({'Close': [712345.67, 712399.01]}, index=_DATES[:2])
+
+        _scripted_ticker().return_value.history.return_value = df
+        stored = download_history(['BRK.A'], '2020-01-01')['BRK.A']
+
+        self.assertEqual(stored['Close'].dtype, np.float64)
+        self.assertEqual(stored['Close'].tolist(), [712345.67, 712399.01])
+
+    def test_download_history_stores_floats_as_float32_on_request(self):
+        """Test that dtype='float32' downcasts float prices and keeps integer columns"""
+        from portfolio_analyzer.utils import download_history
+
+        df = pd.DataFrame({'Close': [89.3499984741211, 90.12000274658203], 'Volume': [10, 11]},
+                          index=_DATES[:2])
+
+        _scripted_ticker().return_value.history.return_value = df
+        stored = download_history(['SBUX'], '2020-01-01', columns=None, dtype='float32')['SBUX']
+
+        self.assertEqual(stored['Close'].dtype, np.float32)
+        self.assertEqual(stored['Volume'].dtype, df['Volume'].dtype)
+        self.assertEqual(stored['Close'].astype(float).tolist(), df['Close'].tolist())
+
+    def test_download_history_groups_by_ticker(self):
+        """Test that per-ticker downloads are combined into ticker-grouped columns"""
+        from portfolio_analyzer.utils import download_history, extract_history
+        from unittest.mock import MagicMock
+
+        dates = pd.date_range('2020-01-01', periods=3, tz='America/New_York')
+        closes = {'SBUX': [90.0, 91.0, 92.0], 'MSFT': [160.0, 161.0, 162.0], 'BAD': []}
+
+        def fake_ticker(symbol):
+            ticker = MagicMock()
+            index = dates[:len(closes[symbol])]
+            ticker.history.return_value = pd.DataFrame({'Close': closes[symbol]}, index=index)
+            return ticker
+
+        _scripted_ticker().side_effect = fake_ticker
+        result = download_history(['SBUX', 'MSFT', 'BAD', 'SBUX'], '2020-01-01', max_workers=2)
+
+        self.assertEqual(list(result.columns.get_level_values(0)), ['MSFT', 'SBUX'])
+        self.assertIsNone(result.index.tz)
+        self.assertEqual(extract_history(result, 'SBUX')['Close'].tolist(), closes['SBUX'])
+        self.assertTrue(extract_history(result, 'BAD').empty)
+
+
+class TestDownloadMemo(unittest.TestCase):
+    """Test the in-process memo in front of download_history"""
+    
+    def setUp(self):
+        utils.clear_download_history_cache()
+        self.addCleanup(utils.clear_download_history_cache)
+        # The memo follows the cache switch, so turn caching on but keep the disk out of it
+        env = patch.dict(os.environ, {utils.DOWNLOAD_CACHE_ENV: tempfile.gettempdir()})
+        env.start()
+        self.addCleanup(env.stop)
+        disk = patch.object(utils, '_download_cache_path', return_value=None)
+        disk.start()
+        self.addCleanup(disk.stop)
+        
+        self.data = pd.DataFrame({'Close': [100.0, 101.0]},
+                                 index=_DATES[:2])
+        self.download = _scripted_ticker().return_value.history
+        self.download.return_value = self.data
+    
+    def test_repeat_download_served_from_memory(self):
+        """Test that repeat calls share one download whatever the ticker order"""
+        first = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        second = utils.download_history(['MSFT', 'SBUX', 'SBUX'], '2020-01-01')
+        
+        self.assertEqual(self.download.call_count, 2)
+        pd.testing.assert_frame_equal(second, first)
+    
+    def test_callers_get_their_own_frame(self):
+        """Test that renaming the returned frame's columns leaves the memo intact"""
+        first = utils.download_history(['SBUX'], '2020-01-01')
+        first.columns = ['renamed']
+        
+        second = utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(list(second.columns), [('SBUX', 'Close')])
+    
+    def test_clear_forgets_downloads(self):
+        """Test that clearing the memo downloads again"""
+        utils.download_history(['SBUX'], '2020-01-01')
+        utils.clear_download_history_cache()
+        utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 2)
+    
+    def test_memo_is_bounded(self):
+        """Test that the oldest download is evicted beyond DOWNLOAD_MEMO_SIZE"""
+        with patch.object(utils, 'DOWNLOAD_MEMO_SIZE', 2):
+            for start in ('2020-01-01', '2020-01-02', '2020-01-03'):
+                utils.download_history(['SBUX'], start)
+            utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 4)
+    
+    def test_partial_download_not_memoized(self):
+        """Test that a download missing a failed ticker is fetched again in full"""
+        _script_failing_once(self.data, 'MSFT')
+        first = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        second = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        
+        self.assertEqual(list(first.columns.get_level_values(0)), ['SBUX'])
+        self.assertEqual(list(second.columns.get_level_values(0)), ['MSFT', 'SBUX'])
+    
+    def test_empty_cache_dir_disables_memo(self):
+        """Test that an empty PORTFOLIO_ANALYZER_CACHE_DIR turns the memo off too"""
+        with patch.dict(os.environ, {utils.DOWNLOAD_CACHE_ENV: ''}):
+            utils.download_history(['SBUX'], '2020-01-01')
+            utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 2)
+
+
+@unittest.skipUnless(utils.PYARROW_AVAILABLE, "pyarrow not installed")
+class TestDownloadCache(unittest.TestCase):
+    """Test the on-disk Parquet cache behind download_history"""
+    
+    def setUp(self):
+        # Keep the in-process memo empty so every lookup reaches the disk
+        utils.clear_download_history_cache()
+        self.addCleanup(utils.clear_download_history_cache)
+        memo = patch.object(utils, '_remember_download')
+        memo.start()
+        self.addCleanup(memo.stop)
+        
+        self._cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._cache_dir.cleanup)
+        env = patch.dict(os.environ, {utils.DOWNLOAD_CACHE_ENV: self._cache_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        
+        self.data = pd.DataFrame({'Close': [100.0, 101.0], 'Volume': [10, 11]},
+                                 index=_DATES[:2])
+        self.download = _scripted_ticker().return_value.history
+        self.download.return_value = self.data
+    
+    def test_repeat_download_served_from_disk(self):
+        """Test that the same tickers and start date are downloaded once per day"""
+        first = utils.download_history(['SBUX'], '2020-01-01')
+        second = utils.download_history(['SBUX'], '2020-01-01')
+        
+        self.assertEqual(self.download.call_count, 1)
+        pd.testing.assert_frame_equal(second, first, check_freq=False)
+    
+    def test_different_start_date_downloads_again(self):
+        """Test that the cache is keyed on the start date"""
+        utils.download_history(['SBUX'], '2020-01-01')
+        utils.download_history(['SBUX'], '2020-01-02')
+        self.assertEqual(self.download.call_count, 2)
+    
+    def test_different_columns_download_again(self):
+        """Test that the cache is keyed on the kept price columns"""
+        narrow = utils.download_history(['SBUX'], '2020-01-01')
+        full = utils.download_history(['SBUX'], '2020-01-01', columns=None)
+        
+        self.assertEqual(self.download.call_count, 2)
+        self.assertEqual(list(narrow['SBUX'].columns), ['Close'])
+        self.assertEqual(list(full['SBUX'].columns), ['Close', 'Volume'])
+    
+    def test_cache_from_previous_day_is_refreshed(self):
+        """Test that a cache file not written today is ignored"""
+        utils.download_history(['SBUX'], '2020-01-01')
+        path = utils._download_cache_path(['SBUX'], '2020-01-01')
+        yesterday = (datetime.now() - timedelta(days=1)).timestamp()
+        os.utime(path, (yesterday, yesterday))
+        
+        utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 2)
+    
+    def test_empty_download_not_cached(self):
+        """Test that failed (empty) downloads are retried"""
+        self.download.return_value = pd.DataFrame()
+        utils.download_history(['SBUX'], '2020-01-01')
+        utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 2)
+    
+    def test_partial_download_not_cached(self):
+        """Test that a download missing a failed ticker is not written to disk"""
+        _script_failing_once(self.data, 'MSFT')
+        first = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        self.assertFalse(utils._download_cache_path(['SBUX', 'MSFT'], '2020-01-01').exists())
+        
+        second = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        third = utils.download_history(['SBUX', 'MSFT'], '2020-01-01')
+        
+        self.assertEqual(list(first.columns.get_level_values(0).unique()), ['SBUX'])
+        self.assertEqual(list(second.columns.get_level_values(0).unique()), ['MSFT', 'SBUX'])
+        # The complete retry is cached, so the third call downloads nothing
+        self.assertEqual(_ticker_mock.call_count, 4)
+        pd.testing.assert_frame_equal(third, second, check_freq=False)
+    
+    def test_empty_cache_dir_disables_cache(self):
+        """Test that an empty PORTFOLIO_ANALYZER_CACHE_DIR turns caching off"""
+        with patch.dict(os.environ, {utils.DOWNLOAD_CACHE_ENV: ''}):
+            self.assertIsNone(utils._download_cache_path(['SBUX'], '2020-01-01'))
+            utils.download_history(['SBUX'], '2020-01-01')
+            utils.download_history(['SBUX'], '2020-01-01')
+        self.assertEqual(self.download.call_count, 2)
 
 
 class TestTickerNormalization(unittest.TestCase):